@@ -1,8 +1,14 @@
-from flask import Flask
+from flask import Flask, request
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from .extensions.db import db
+from .extensions.model_registry import model_registry
+from .extensions.job_queue import job_queue
+from .extensions.request_metrics import request_metrics
+from .extensions.identity_cache import identity_cache
+from .extensions.admission import admission
+from .prefork import prefork_enabled
 from .models.dbSchema import User, Admin
 from flask_jwt_extended import JWTManager
 from flask_swagger_ui import get_swaggerui_blueprint
@@ -10,13 +16,18 @@ from flask_swagger_ui import get_swaggerui_blueprint
 from . import create_admin
 
 import os
-from datetime import timedelta
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
 load_dotenv()
 
-def create_app():
-    """Create and configure an instance of the Flask application."""
+def create_app(model_loading=None):
+    """Create and configure an instance of the Flask application.
+
+    `model_loading` overrides the MODEL_LOADING setting; "none" builds a model-free
+    app with only the auth routes and Swagger, for workers that never run inference.
+    """
     app = Flask(__name__)
+    model_loading = (model_loading or os.getenv('MODEL_LOADING') or 'background').lower()
         
     # Configuration settings
     app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY') or 'default-secret-key'
@@ -24,6 +35,7 @@ def create_app():
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
     app.config['JWT_REFRESH_TOKEN_EXPIRES'] = timedelta(days=30)
+    app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_REQUEST_MB') or 64) * 1024 * 1024
     
     if not app.config['JWT_SECRET_KEY']:
         raise ValueError("No JWT_SECRET_KEY set for application")
@@ -34,17 +46,31 @@ def create_app():
     # Initialize Extensions
     db.init_app(app)
     jwt = JWTManager(app)
+    identity_cache.init_app(app, jwt)
     limiter = Limiter(app=app, key_func=get_remote_address, default_limits=["1000000 per hour"])
 
     with app.app_context():
         db.create_all()
+        # create_all skips tables that already exist, so indexes added to them later are created here
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(db.engine, checkfirst=True)
+        # Rows created before created_at was required would break the keyset cursors of the user listing
+        for model in (User, Admin):
+            db.session.query(model).filter(model.created_at.is_(None)).update(
+                {model.created_at: db.func.coalesce(model.updated_at, datetime.utcnow()), model.updated_at: model.updated_at},
+                synchronize_session=False)
+        db.session.commit()
 
     # Import Blueprint
-    from app.api.model_routes import model_blueprint
+    from app.api.model_routes import model_blueprint, rate_limit_cost
     from app.api.auth_routes import auth_blueprint
+    from app.api.metrics_routes import metrics_blueprint
 
-    # Limiter
-    limiter.limit("10 per minute")(model_blueprint)
+    # Limiter (readiness probes, fetches of already rendered images and job polling are not rate limited)
+    unlimited_endpoints = ('model.ready', 'model.annotated_image', 'model.job_status', 'model.job_result')
+    limiter.limit("10 per minute", cost=rate_limit_cost,
+                  exempt_when=lambda: request.endpoint in unlimited_endpoints)(model_blueprint)
 
     # CORS
     CORS(app, resources={
@@ -53,8 +79,15 @@ def create_app():
     })
     
     # Register Blueprint
-    app.register_blueprint(model_blueprint, url_prefix='/api/model')
+    if model_loading != 'none':
+        # Under a pre-forking server the master only loads; each worker starts its own threads
+        model_registry.init_app(app, model_loading, prefork=prefork_enabled())
+        job_queue.init_app(app, start=not prefork_enabled())
+        admission.init_app(app)
+        app.register_blueprint(model_blueprint, url_prefix='/api/model')
     app.register_blueprint(auth_blueprint, url_prefix='/api/auth')
+    app.register_blueprint(metrics_blueprint)
+    request_metrics.init_app(app)
     
     # Create Admin
     create_admin.init_app(app)
@@ -2,5 +2,6 @@ from flask import Blueprint
 
 model_blueprint = Blueprint('model', __name__)
 auth_blueprint = Blueprint('auth', __name__)
+metrics_blueprint = Blueprint('metrics', __name__)
 
-from . import model_routes, auth_routes
+from . import model_routes, auth_routes, metrics_routes
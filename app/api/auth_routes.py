@@ -1,12 +1,19 @@
-from flask import request, current_app
+from flask import request, current_app, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity, create_access_token, create_refresh_token
 from datetime import datetime
 from app.api import auth_blueprint
+from pydantic import ValidationError
+from sqlalchemy import tuple_
 from sqlalchemy.exc import IntegrityError
 from ..utilities import make_response_util, admin_required
 from ..models import dbSchema, authSchema
 from ..extensions.db import db
+from ..extensions.identity_cache import identity_cache
 from werkzeug.security import generate_password_hash, check_password_hash
+import json
+
+# Users read per query while streaming the JSON-lines export
+USERS_EXPORT_BATCH_SIZE = 1000
 
 @auth_blueprint.route("/register", methods=["POST"])
 def register():
@@ -21,9 +28,11 @@ def register():
         password = user_data.password
         user_type = user_data.user_type
 
-        existing_user = dbSchema.User.query.filter_by(username=username).first()
-        existing_admin = dbSchema.Admin.query.filter_by(username=username).first()
-        if existing_user or existing_admin:
+        # Usernames are unique across both tables; one round trip over both unique indexes
+        username_taken = db.session.query(dbSchema.User.id).filter(dbSchema.User.username == username).union_all(
+            db.session.query(dbSchema.Admin.id).filter(dbSchema.Admin.username == username)
+        ).first()
+        if username_taken:
             current_app.logger.warning("⚠️ User already exists: %s", username)
             return make_response_util(409, description="User already exists", error="Conflict")
 
@@ -56,12 +65,8 @@ def register():
 @admin_required
 def delete_user():
     try:
+        # admin_required has already checked that this admin exists and is active
         admin_id = get_jwt_identity()
-        admin = dbSchema.Admin.query.get(admin_id)
-        
-        if not admin:
-            current_app.logger.warning("⚠️ Admin not found")
-            return make_response_util(404, description="Admin not found", error="Forbidden")
         
         user_id_to_delete = request.args.get('id', type=int)
         
@@ -79,6 +84,8 @@ def delete_user():
         user_to_delete.deleted_by = f"Admin {admin_id}"
         
         db.session.commit()
+        # Tokens of the user are rejected from the next request on, not once the cache entry expires
+        identity_cache.invalidate("user", user_id_to_delete)
         
         current_app.logger.info("🗑️ User %d soft deleted by Admin %d", user_id_to_delete, admin_id)
         
@@ -93,14 +100,103 @@ def delete_user():
         current_app.logger.error("❌ Error deleting user [%d]: %s", user_id_to_delete, str(e))
         return make_response_util(500, description="An error occurred during deleting user", error="Internal Server Error")
     
+@auth_blueprint.route("/users/bulk_delete", methods=["POST"])
+@jwt_required()
+@admin_required
+def bulk_delete_users():
+    try:
+        data = request.get_json(silent=True)
+        if not data:
+            current_app.logger.warning("⚠️ No data provided or Invalid JSON data")
+            return make_response_util(400, description="No data provided or Invalid JSON data", error="Bad Request")
+        bulk = authSchema.BulkDeleteUsers(**data)
+    except ValidationError as e:
+        current_app.logger.warning(f"⚠️ Invalid request: {e.errors()[0]['msg']}")
+        return make_response_util(400, description=f"Invalid request: {e.errors()[0]['msg']}", error="Bad Request")
+    
+    admin_id = get_jwt_identity()
+    try:
+        # One UPDATE for the whole list; users already deleted or unknown are simply not counted
+        deleted = dbSchema.User.query.filter(
+            dbSchema.User.id.in_(bulk.ids), dbSchema.User.is_active.is_(True)
+        ).update({
+            dbSchema.User.is_active: False,
+            dbSchema.User.deleted_at: datetime.utcnow(),
+            dbSchema.User.deleted_by: admin_id,
+        }, synchronize_session=False)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error("❌ Error bulk deleting users: %s", str(e))
+        return make_response_util(500, description="An error occurred during deleting users", error="Internal Server Error")
+    
+    identity_cache.invalidate_many("user", bulk.ids)
+    current_app.logger.info("🗑️ %d of %d users soft deleted by Admin %s", deleted, len(bulk.ids), admin_id)
+    return make_response_util(200, message={"requested": len(bulk.ids), "deleted": deleted})
+
+def users_query(filters, after=None):
+    """Users matching the listing filters in (created_at, id) order, starting after the keyset position `after`."""
+    User = dbSchema.User
+    # Plain rows instead of User objects: nothing piles up in the session during an export
+    query = db.session.query(User.id, User.username, User.is_active, User.created_at, User.deleted_at)
+    if filters.active is not None:
+        query = query.filter(User.is_active.is_(filters.active))
+    if filters.created_after:
+        query = query.filter(User.created_at >= filters.created_after)
+    if filters.created_before:
+        query = query.filter(User.created_at < filters.created_before)
+    if after:
+        query = query.filter(tuple_(User.created_at, User.id) > tuple_(*after))
+    return query.order_by(User.created_at, User.id)
+
+def user_to_dict(row):
+    return {
+        'id': row.id,
+        'username': row.username,
+        'is_active': row.is_active,
+        'created_at': row.created_at.isoformat() if row.created_at else None,
+        'deleted_at': row.deleted_at.isoformat() if row.deleted_at else None,
+    }
+
+def export_users(filters, after):
+    while True:
+        rows = users_query(filters, after).limit(USERS_EXPORT_BATCH_SIZE).all()
+        # End the read transaction between batches, so a long export does not pin old data
+        db.session.rollback()
+        if rows:
+            yield "".join(json.dumps(user_to_dict(row)) + "\n" for row in rows)
+        if len(rows) < USERS_EXPORT_BATCH_SIZE:
+            return
+        after = (rows[-1].created_at, rows[-1].id)
+
 @auth_blueprint.route("/users", methods=["GET"])
 @jwt_required()
 @admin_required
 def list_users():
-    users = dbSchema.User.query.all()
-    users_list = [{'id': user.id, 'username': user.username} for user in users]
-    current_app.logger.info("📋 List of users retrieved")
-    return make_response_util(200, message=users_list)
+    try:
+        filters = authSchema.UserListQuery(**request.args.to_dict())
+    except ValidationError as e:
+        current_app.logger.warning(f"⚠️ Invalid request: {e.errors()[0]['msg']}")
+        return make_response_util(400, description=f"Invalid request: {e.errors()[0]['msg']}", error="Bad Request")
+    
+    if filters.format == "jsonl":
+        current_app.logger.info("📤 Users export started")
+        return Response(stream_with_context(export_users(filters, filters.after())), mimetype="application/x-ndjson",
+                        headers={"Content-Disposition": 'attachment; filename="users.jsonl"'})
+    
+    try:
+        # One extra row tells whether there is a next page
+        rows = users_query(filters, filters.after()).limit(filters.limit + 1).all()
+    except Exception as e:
+        current_app.logger.error("❌ Error retrieving users: %s", str(e))
+        return make_response_util(500, description="An error occurred while retrieving users", error="Internal Server Error")
+    
+    page = rows[:filters.limit]
+    next_cursor = None
+    if len(rows) > filters.limit:
+        next_cursor = authSchema.UserListQuery.encode_cursor(page[-1].created_at, page[-1].id)
+    current_app.logger.info("📋 Page of %d users retrieved", len(page))
+    return make_response_util(200, message={"users": [user_to_dict(row) for row in page], "next_cursor": next_cursor})
 
 @auth_blueprint.route("/login", methods=["POST"])
 def login():
@@ -123,6 +219,7 @@ def login():
             # Update last login timestamp
             user.last_login = datetime.now()
             db.session.commit()
+            identity_cache.remember(login_data.user_type.value, user.id, user.is_active)
 
             # Log successful login
             current_app.logger.info("🔓 Successful login for %s %s", login_data.user_type, login_data.username)
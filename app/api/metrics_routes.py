@@ -0,0 +1,21 @@
+from flask import request, current_app, Response
+from app.api import metrics_blueprint
+from ml_model.metrics import registry
+from ..utilities import make_response_util
+import hmac
+import os
+
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+
+@metrics_blueprint.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus text exposition of the stage, batch-size and request metrics of this process."""
+    if METRICS_TOKEN:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not hmac.compare_digest(supplied, METRICS_TOKEN):
+            current_app.logger.warning("⚠️ Metrics scrape with an invalid token")
+            return make_response_util(401, description="Invalid metrics token", error='Unauthorized')
+    
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
@@ -1,59 +1,507 @@
-from flask import request, current_app
+from flask import request, current_app, Response, stream_with_context, url_for
 from flask_jwt_extended import jwt_required
 from app.api import model_blueprint
-from ml_model.large_language_models import Llama3_1_70B
-from ml_model.optical_character_recognition import OpticalCharacterRecognition
+from ml_model.cache import LRUCache, SQLiteCache, TieredCache
+from ml_model.errors import CircuitOpenError, UpstreamBusyError
+from ml_model.metrics import timed
+from ..extensions.model_registry import model_registry
+from ..extensions.job_queue import job_queue, JobQueueFullError
+from ..extensions.admission import admission, AdmissionRejected
+from ..models import dbSchema
+from ..extensions.db import db
 from ..utilities import (make_response_util, 
-                         base64_to_pil,
-                         pil_to_cv2)
-import supervision as sv
-from ..models.apiSchema import InputImageBase64, PrescriptionText
+                         format_sse,
+                         PrefetchedStream,
+                         bytes_to_cv2,
+                         ImageTooLargeError,
+                         admin_required,
+                         admission_required,
+                         admission_rejected_response,
+                         current_owner,
+                         models_ready_required)
+from ..models.apiSchema import InputImageBase64, InputImageBase64Batch, JobRequest, OCROutputOptions, PrescriptionText, check_image_signature
+from pydantic import ValidationError
+import base64
+import json
+import math
+import os
+import secrets
+import time
 
 
-ocr = OpticalCharacterRecognition()
-llm = Llama3_1_70B()
+# OCR results (text + detections, no image) keyed by image bytes + model version;
+# the SQLite tier is opt-in via OCR_CACHE_DB
+OCR_CACHE_PREFIX = "pages"
+ocr_cache = TieredCache(
+    LRUCache(
+        max_entries=int(os.getenv("OCR_CACHE_MAX_ENTRIES") or 256),
+        max_bytes=int(os.getenv("OCR_CACHE_MAX_MB") or 128) * 1024 * 1024,
+        sizeof=lambda result: len(json.dumps(result)),
+    ),
+    SQLiteCache(
+        os.getenv("OCR_CACHE_DB"),
+        max_bytes=int(os.getenv("OCR_CACHE_DISK_MAX_MB") or 1024) * 1024 * 1024,
+    ) if os.getenv("OCR_CACHE_DB") else None,
+)
+
+# Annotated images served through a fetch URL instead of inline base64: (bytes, mimetype, owner)
+annotated_images = LRUCache(
+    max_entries=1024,
+    max_bytes=int(os.getenv("ANNOTATED_IMAGE_CACHE_MB") or 64) * 1024 * 1024,
+    ttl=int(os.getenv("ANNOTATED_IMAGE_TTL_SECONDS") or 300),
+    sizeof=lambda entry: len(entry[0]),
+)
+IMAGE_MIMETYPES = {"jpeg": "image/jpeg", "webp": "image/webp"}
+
+# A batch upload is one limiter hit weighing one unit per OCR_BATCH_IMAGES_PER_COST images
+OCR_BATCH_IMAGES_PER_COST = int(os.getenv("OCR_BATCH_IMAGES_PER_COST") or 5)
+
+
+def read_uploaded_image():
+    """Encoded image bytes from a multipart `image` file, a raw image/* body or the base64 JSON body.
+
+    Returns None when the request carries no image at all.
+    """
+    with timed("request_decode"):
+        return _read_uploaded_image()
+
+
+def _read_uploaded_image():
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('image')
+        if upload is None:
+            return None
+        return check_image_signature(upload.read())
+    
+    if request.mimetype.startswith('image/'):
+        image_bytes = request.get_data(cache=False)
+        return check_image_signature(image_bytes) if image_bytes else None
+    
+    data = request.get_json(silent=True)
+    if not data or 'image' not in data:
+        return None
+    return InputImageBase64(**data).image_bytes
+
+
+def ocr_cache_key(image_bytes):
+    return f"{OCR_CACHE_PREFIX}:{model_registry.ocr.result_cache_key(image_bytes)}"
+
+
+def run_ocr(image_bytes, options, timings=None):
+    """Decode, detect and recognize one image, going through the OCR cache.
+
+    Returns the cv2 image (None when the page was cached and no annotated image is wanted)
+    and the page. Stage durations in ms are added to `timings` when given.
+    """
+    timings = timings if timings is not None else {}
+    cache_key = ocr_cache_key(image_bytes)
+    page = ocr_cache.get(cache_key)
+    timings["ocr_cache_hit"] = page is not None
+    
+    # Only the annotated image needs pixels once the detections are cached
+    cv2_image = None
+    if page is None or options.include_image:
+        current_app.logger.info("🖼️ Decoding image to cv2 format")
+        with timed("image_decode") as stage:
+            cv2_image = bytes_to_cv2(image_bytes)
+        timings["decode_ms"] = stage.ms
+    
+    if page is not None:
+        current_app.logger.info("♻️ Using cached OCR result")
+        return cv2_image, page
+    
+    current_app.logger.info("🔎 Performing OCR")
+    with timed("detect") as stage:
+        do_detections = model_registry.ocr_engine.predict_yolo([cv2_image])[0]
+    timings["detect_ms"] = stage.ms
+    
+    current_app.logger.info("🧠 Inferencing OCR results")
+    with timed("recognize") as stage:
+        page = model_registry.ocr_engine.read_pages([cv2_image], [do_detections])[0]
+    timings["recognize_ms"] = stage.ms
+    
+    ocr_cache.set(cache_key, page)
+    return cv2_image, page
+
+
+def build_ocr_result(cv2_image, page, options):
+    """Reply body for one page: text and detections, plus the annotated image when requested."""
+    ocr = model_registry.ocr
+    result = {
+        "prescription_text": "\n".join(page["texts"]),
+        "detections": ocr.describe_page(page)
+    }
+    if not options.include_image:
+        return result
+    
+    image_data = ocr.render_page(cv2_image, page, options.image_format, options.image_quality, options.image_max_side)
+    result["image_format"] = options.image_format
+    if options.image_delivery == "url":
+        token = secrets.token_urlsafe(24)
+        annotated_images.set(token, (image_data, IMAGE_MIMETYPES[options.image_format], current_owner()))
+        result["image_url"] = url_for('model.annotated_image', token=token)
+    else:
+        result["image"] = base64.b64encode(image_data).decode("utf-8")
+    return result
+
+
+def run_job(job):
+    """Job handler: the /ocr result, plus the explanation for pipeline jobs."""
+    options = OCROutputOptions(**json.loads(job.options))
+    timings = {}
+    cv2_image, page = run_ocr(job.input_image, options, timings)
+    result = build_ocr_result(cv2_image, page, options)
+    
+    if job.kind == "pipeline" and result["prescription_text"].strip():
+        started = time.perf_counter()
+        result["explanation"] = model_registry.llm.analyze_prescription(result["prescription_text"])
+        timings["llm_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    result["timings"] = timings
+    return result
+
+
+job_queue.register("ocr", run_job)
+job_queue.register("pipeline", run_job)
+
+
+def describe_job(job):
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "attempts": job.attempts,
+        "error": job.error,
+        "callback_status": job.callback_status,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "status_url": url_for('model.job_status', job_id=job.id),
+        "result_url": url_for('model.job_result', job_id=job.id)
+    }
+
+
+def find_own_job(job_id):
+    """The job if it exists and belongs to the caller; another user's job counts as missing."""
+    job = db.session.get(dbSchema.Job, job_id)
+    return job if job is not None and job.owner == current_owner() else None
+
+
+def ocr_admission_cost():
+    """OCR admission units of the current request, by body size (images are not decoded yet)."""
+    return admission.ocr_cost(request.content_length)
+
+
+def llm_admission_cost():
+    """LLM admission units of the current request, by prescription text length."""
+    data = request.get_json(silent=True)
+    return admission.llm_cost(data.get('prescription_text') if isinstance(data, dict) else None)
+
+
+def rate_limit_cost():
+    """Cost of the current request against the blueprint rate limit."""
+    if request.endpoint == 'model.input_image_batch':
+        data = request.get_json(silent=True)
+        images = data.get('images') if isinstance(data, dict) else None
+        if isinstance(images, list):
+            return max(1, math.ceil(len(images) / OCR_BATCH_IMAGES_PER_COST))
+    return 1
+
 
 @model_blueprint.route('/ocr', methods=['POST'])
 @jwt_required()
+@models_ready_required
+@admission_required('ocr', ocr_admission_cost)
 def input_image():
-    """Do an OCR from input image."""
+    """Do an OCR from input image (base64 JSON, multipart/form-data or a raw image/* body)."""
     current_app.logger.info("📥 Received request for OCR")
 
-    if 'image' not in request.json:
+    try:
+        options = OCROutputOptions(**request.args.to_dict())
+        image_bytes = read_uploaded_image()
+    except ValueError as e:
+        reason = e.errors()[0]['msg'] if isinstance(e, ValidationError) else str(e)
+        current_app.logger.warning(f"⚠️ Invalid request: {reason}")
+        return make_response_util(400, description=f"Invalid request: {reason}", error='Bad Request')
+    
+    if image_bytes is None:
         current_app.logger.warning("⚠️ No image data in the request")
         return make_response_util(400, description="No image data in the request", error='Bad Request')
     
-    base64_image = InputImageBase64(**request.get_json())
     try:
-        current_app.logger.info("🖼️ Converting base64 image to PIL format")
-        pil_image = base64_to_pil(base64_image.image)
-        
-        current_app.logger.info("🔄 Converting PIL image to cv2 format")
-        cv2_image = pil_to_cv2(pil_image)
-        
-        current_app.logger.info("🔎 Performing OCR")
-        do_ocr = ocr.model_yolo(source=cv2_image, conf=0.25, iou=0.45, agnostic_nms=True)[0]
-        do_detections = sv.Detections.from_ultralytics(do_ocr)
-        
-        current_app.logger.info("🧠 Inferencing OCR results")
-        output_image, output_text = ocr.inferencing(cv2_image.copy(), do_detections)
-        
-        structured_output_text = "\n".join(output_text)
-        
-        result = {
-            "prescription_text": structured_output_text,
-            "image": output_image
-        }
+        cv2_image, page = run_ocr(image_bytes, options)
+        result = build_ocr_result(cv2_image, page, options)
         
         current_app.logger.info("✅ OCR processing completed successfully")
         return make_response_util(200, description="Image processed successfully", message=result)
+    except ImageTooLargeError as e:
+        current_app.logger.warning(f"⚠️ Image rejected: {str(e)}")
+        return make_response_util(413, description=str(e), error='Payload Too Large')
     except Exception as e:
         current_app.logger.error(f"❌ Error processing image: {str(e)}")
         return make_response_util(400, description=f"Error processing image: {str(e)}", error='Bad Request')
 
 
+@model_blueprint.route('/ocr/batch', methods=['POST'])
+@jwt_required()
+@models_ready_required
+@admission_required('ocr', ocr_admission_cost)
+def input_image_batch():
+    """Do an OCR from a bundle of input images, with one YOLO and one TrOCR pass for the whole bundle."""
+    current_app.logger.info("📥 Received request for batch OCR")
+
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict) or 'images' not in data:
+        current_app.logger.warning("⚠️ No images in the request")
+        return make_response_util(400, description="No images in the request", error='Bad Request')
+    
+    try:
+        options = OCROutputOptions(**request.args.to_dict())
+        batch = InputImageBase64Batch(**data)
+    except ValidationError as e:
+        current_app.logger.warning(f"⚠️ Invalid request: {e.errors()[0]['msg']}")
+        return make_response_util(400, description=f"Invalid request: {e.errors()[0]['msg']}", error='Bad Request')
+    
+    results = [None] * len(batch.images)
+    
+    current_app.logger.info("🖼️ Decoding %d images", len(batch.images))
+    # (index, cv2 image, cached page) per valid image; pages still to infer are None
+    items = []
+    for index, image in enumerate(batch.images):
+        try:
+            image_bytes = InputImageBase64(image=image).image_bytes
+            cache_key = ocr_cache_key(image_bytes)
+            page = ocr_cache.get(cache_key)
+            cv2_image = None
+            if page is None or options.include_image:
+                with timed("image_decode"):
+                    cv2_image = bytes_to_cv2(image_bytes)
+            items.append((index, cache_key, cv2_image, page))
+        except ValidationError as e:
+            current_app.logger.warning("⚠️ Image %d rejected: %s", index, e.errors()[0]['msg'])
+            results[index] = {"index": index, "error": e.errors()[0]['msg']}
+        except Exception as e:
+            current_app.logger.warning("⚠️ Image %d could not be decoded: %s", index, str(e))
+            results[index] = {"index": index, "error": f"Error decoding image: {str(e)}"}
+    
+    try:
+        pending = [item for item in items if item[3] is None]
+        if pending:
+            cv2_images = [cv2_image for _, _, cv2_image, _ in pending]
+            current_app.logger.info("🔎 Performing OCR on %d images", len(cv2_images))
+            with timed("detect"):
+                detections_list = model_registry.ocr_engine.predict_yolo(cv2_images)
+            
+            current_app.logger.info("🧠 Inferencing OCR results")
+            with timed("recognize"):
+                pages = iter(model_registry.ocr_engine.read_pages(cv2_images, detections_list))
+            for position, (index, cache_key, cv2_image, page) in enumerate(items):
+                if page is None:
+                    page = next(pages)
+                    ocr_cache.set(cache_key, page)
+                    items[position] = (index, cache_key, cv2_image, page)
+        
+        for index, _, cv2_image, page in items:
+            results[index] = {"index": index, **build_ocr_result(cv2_image, page, options)}
+        
+        current_app.logger.info("✅ Batch OCR processing completed (%d images inferred, %d total)", len(pending), len(results))
+        return make_response_util(200, description="Images processed", message={"results": results})
+    except Exception as e:
+        current_app.logger.error(f"❌ Error processing images: {str(e)}")
+        return make_response_util(400, description=f"Error processing images: {str(e)}", error='Bad Request')
+
+
+@model_blueprint.route('/pipeline/stream', methods=['POST'])
+@jwt_required()
+@models_ready_required
+def pipeline_stream():
+    """OCR an image and stream its LLM explanation in one request, as Server-Sent Events.
+
+    The LLM request starts as soon as the text is recognized, so the annotated image is
+    rendered and the `ocr` event sent while the upstream works on its first token. OCR
+    capacity is only held while recognizing, LLM capacity until the stream ends.
+    """
+    current_app.logger.info("📥 Received request for the OCR + explanation pipeline")
+    started = time.perf_counter()
+    
+    try:
+        options = OCROutputOptions(**request.args.to_dict())
+        image_bytes = read_uploaded_image()
+    except ValueError as e:
+        reason = e.errors()[0]['msg'] if isinstance(e, ValidationError) else str(e)
+        current_app.logger.warning(f"⚠️ Invalid request: {reason}")
+        return make_response_util(400, description=f"Invalid request: {reason}", error='Bad Request')
+    
+    if image_bytes is None:
+        current_app.logger.warning("⚠️ No image data in the request")
+        return make_response_util(400, description="No image data in the request", error='Bad Request')
+    
+    timings = {}
+    try:
+        ocr_ticket = admission.admit('ocr', current_owner(), admission.ocr_cost(len(image_bytes)))
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
+    try:
+        cv2_image, page = run_ocr(image_bytes, options, timings)
+    except ImageTooLargeError as e:
+        current_app.logger.warning(f"⚠️ Image rejected: {str(e)}")
+        return make_response_util(413, description=str(e), error='Payload Too Large')
+    except Exception as e:
+        current_app.logger.error(f"❌ Error processing image: {str(e)}")
+        return make_response_util(400, description=f"Error processing image: {str(e)}", error='Bad Request')
+    finally:
+        ocr_ticket.release()
+    
+    prescription_text = "\n".join(page["texts"])
+    llm_ticket = None
+    if prescription_text.strip():
+        try:
+            llm_ticket = admission.admit('llm', current_owner(), admission.llm_cost(prescription_text))
+        except AdmissionRejected as e:
+            # The OCR result is cached by now, so a retry only waits for the LLM
+            return admission_rejected_response(e)
+    explanation = None
+    
+    def elapsed_ms(since):
+        return round((time.perf_counter() - since) * 1000, 1)
+    
+    def events():
+        try:
+            render_started = time.perf_counter()
+            result = build_ocr_result(cv2_image, page, options)
+            timings["render_ms"] = elapsed_ms(render_started)
+            yield format_sse({**result, "timings": dict(timings)}, event="ocr")
+            
+            if explanation is None:
+                yield format_sse({"error": "No prescription text found in the image"}, event="error")
+                return
+            
+            for chunk in explanation:
+                if "llm_ttft_ms" not in timings:
+                    timings["llm_ttft_ms"] = elapsed_ms(llm_started)
+                    current_app.logger.info("⏱️ Time to first token: %.0f ms after OCR", timings["llm_ttft_ms"])
+                yield format_sse({"content": chunk}, event="token")
+        except GeneratorExit:
+            current_app.logger.info("🔌 Client disconnected, pipeline cancelled")
+            raise
+        except Exception as e:
+            current_app.logger.error(f"❌ Error in the OCR + explanation pipeline: {str(e)}")
+            yield format_sse({"error": f"Error generating explanations: {str(e)}"}, event="error")
+            return
+        finally:
+            if explanation is not None:
+                explanation.close()
+        
+        timings["llm_total_ms"] = elapsed_ms(llm_started)
+        timings["total_ms"] = elapsed_ms(started)
+        current_app.logger.info("✅ OCR + explanation pipeline completed in %.0f ms", timings["total_ms"])
+        yield format_sse(timings, event="done")
+    
+    try:
+        llm_started = time.perf_counter()
+        if prescription_text.strip():
+            explanation = PrefetchedStream(lambda: model_registry.llm.stream_prescription(prescription_text))
+        timings["ocr_ms"] = round((llm_started - started) * 1000, 1)
+        
+        response = Response(
+            stream_with_context(events()),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+        if llm_ticket is not None:
+            response.call_on_close(llm_ticket.release)
+    except BaseException:
+        # Until the response owns them, the upstream stream and the LLM units are released here
+        if explanation is not None:
+            explanation.close()
+        if llm_ticket is not None:
+            llm_ticket.release()
+        raise
+    return response
+
+
+@model_blueprint.route('/jobs', methods=['POST'])
+@jwt_required()
+def submit_job():
+    """Queue an OCR (kind=ocr) or OCR + explanation (kind=pipeline) job and return at once."""
+    current_app.logger.info("📥 Received job submission")
+    
+    try:
+        job_request = JobRequest(**request.args.to_dict())
+        image_bytes = read_uploaded_image()
+    except ValueError as e:
+        reason = e.errors()[0]['msg'] if isinstance(e, ValidationError) else str(e)
+        current_app.logger.warning(f"⚠️ Invalid request: {reason}")
+        return make_response_util(400, description=f"Invalid request: {reason}", error='Bad Request')
+    
+    if image_bytes is None:
+        current_app.logger.warning("⚠️ No image data in the request")
+        return make_response_util(400, description="No image data in the request", error='Bad Request')
+    
+    try:
+        job = job_queue.submit(
+            owner=current_owner(),
+            kind=job_request.kind,
+            image_bytes=bytes(image_bytes),
+            options=job_request.ocr_options().model_dump(),
+            callback_url=str(job_request.callback_url) if job_request.callback_url else None
+        )
+    except JobQueueFullError as e:
+        current_app.logger.warning(f"⚠️ Job rejected: {str(e)}")
+        return make_response_util(503, description=str(e), error='Service Unavailable', additional_headers={'Retry-After': '30'})
+    
+    description = describe_job(job)
+    return make_response_util(202, description="Job accepted", message=description,
+                              additional_headers={'Location': description["status_url"]})
+
+
+@model_blueprint.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def job_status(job_id):
+    """State of a job submitted by the caller."""
+    job = find_own_job(job_id)
+    if job is None:
+        return make_response_util(404, description="Job not found", error='Not Found')
+    return make_response_util(200, message=describe_job(job))
+
+
+@model_blueprint.route('/jobs/<job_id>/result', methods=['GET'])
+@jwt_required()
+def job_result(job_id):
+    """Result of a succeeded job; 409 while it is still queued or running, or when it failed."""
+    job = find_own_job(job_id)
+    if job is None:
+        return make_response_util(404, description="Job not found", error='Not Found')
+    if job.status != "succeeded":
+        description = f"Job failed: {job.error}" if job.status == "failed" else f"Job is {job.status}"
+        return make_response_util(409, description=description, error='Conflict', message=describe_job(job))
+    return make_response_util(200, message=json.loads(job.result))
+
+
+@model_blueprint.route('/jobs/stats', methods=['GET'])
+@jwt_required()
+@admin_required
+def job_stats():
+    """Worker pool size, pending jobs in this process and job counts per status."""
+    current_app.logger.info("📊 Job stats retrieved")
+    return make_response_util(200, message=job_queue.stats())
+
+
+@model_blueprint.route('/ocr/image/<token>', methods=['GET'])
+@jwt_required()
+def annotated_image(token):
+    """Fetch an annotated image rendered by an OCR request with `image_delivery=url`."""
+    entry = annotated_images.get(token)
+    # Someone else's image is reported as missing rather than forbidden
+    if entry is None or entry[2] != current_owner():
+        return make_response_util(404, description="Image not found or expired", error='Not Found')
+    
+    image_data, mimetype, _ = entry
+    return Response(image_data, mimetype=mimetype, headers={'Cache-Control': f'private, max-age={int(annotated_images.ttl)}'})
+
+
 @model_blueprint.route('/generate_prescription_explanations', methods=['POST'])
 @jwt_required()
+@admission_required('llm', llm_admission_cost)
 def generate_prescription_explanations():
     """Generate LLM explanations from OCR outputs."""
     current_app.logger.info("📥 Received request for generating prescription explanations")
@@ -65,11 +513,136 @@ def generate_prescription_explanations():
     prescription_text = PrescriptionText(**request.get_json())
     try:
         current_app.logger.info("🧠 Generating LLM explanations")
-        do_generate_prescription_explanations = llm.analyze_prescription(prescription_text.prescription_text)
+        do_generate_prescription_explanations = model_registry.llm.analyze_prescription(prescription_text.prescription_text)
         
         current_app.logger.info("✅ LLM explanations generated successfully")
         return make_response_util(200, description="Explanations generated successfully", message=do_generate_prescription_explanations)
-        
+    
+    except (CircuitOpenError, UpstreamBusyError) as e:
+        current_app.logger.warning(f"⚠️ LLM upstream unavailable: {str(e)}")
+        return make_response_util(503, description=str(e), error='Service Unavailable',
+                                  additional_headers={'Retry-After': str(e.retry_after)})
     except Exception as e:
         current_app.logger.error(f"❌ Error generating explanations: {str(e)}")
         return make_response_util(400, description=f"Error generating explanations: {str(e)}", error='Bad Request')
+
+
+@model_blueprint.route('/generate_prescription_explanations/stream', methods=['POST'])
+@jwt_required()
+@admission_required('llm', llm_admission_cost)
+def stream_prescription_explanations():
+    """Stream LLM explanations from OCR outputs as Server-Sent Events."""
+    current_app.logger.info("📥 Received request for streaming prescription explanations")
+
+    if 'prescription_text' not in request.json:
+        current_app.logger.warning("⚠️ No prescription text in the request")
+        return make_response_util(400, description="No prescription text in the request", error='Bad Request')
+    
+    prescription_text = PrescriptionText(**request.get_json())
+    
+    def events():
+        started = time.perf_counter()
+        time_to_first_token = None
+        try:
+            for chunk in model_registry.llm.stream_prescription(prescription_text.prescription_text):
+                if time_to_first_token is None:
+                    time_to_first_token = time.perf_counter() - started
+                    current_app.logger.info("⏱️ Time to first token: %.0f ms", time_to_first_token * 1000)
+                yield format_sse({"content": chunk}, event="token")
+        except GeneratorExit:
+            current_app.logger.info("🔌 Client disconnected, upstream stream cancelled")
+            raise
+        except Exception as e:
+            current_app.logger.error(f"❌ Error streaming explanations: {str(e)}")
+            yield format_sse({"error": f"Error generating explanations: {str(e)}"}, event="error")
+            return
+        
+        timings = {
+            "time_to_first_token_ms": round(time_to_first_token * 1000, 1) if time_to_first_token is not None else None,
+            "total_ms": round((time.perf_counter() - started) * 1000, 1)
+        }
+        current_app.logger.info("✅ LLM explanations streamed successfully")
+        yield format_sse(timings, event="done")
+    
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@model_blueprint.route('/ready', methods=['GET'])
+def ready():
+    """Readiness probe: 200 once the OCR models are loaded and warmed up, 503 before that."""
+    status = model_registry.status()
+    if status["ready"]:
+        return make_response_util(200, message=status)
+    return make_response_util(503, message=status, error='Service Unavailable')
+
+
+@model_blueprint.route('/scheduler/stats', methods=['GET'])
+@jwt_required()
+@admin_required
+def scheduler_stats():
+    """Queue depth and batch-size statistics of the inference scheduler."""
+    if not model_registry.ready or model_registry.scheduler is None:
+        return make_response_util(200, message={"enabled": False})
+    
+    current_app.logger.info("📊 Inference scheduler stats retrieved")
+    return make_response_util(200, message={"enabled": True, **model_registry.scheduler.stats()})
+
+
+@model_blueprint.route('/executor/stats', methods=['GET'])
+@jwt_required()
+@admin_required
+def executor_stats():
+    """Model threads, torch thread settings and queueing of the inference executor."""
+    if not model_registry.ready:
+        return make_response_util(200, message={"ready": False})
+    
+    current_app.logger.info("📊 Inference executor stats retrieved")
+    return make_response_util(200, message={"ready": True, **model_registry.ocr.executor.stats()})
+
+
+@model_blueprint.route('/admission/stats', methods=['GET'])
+@jwt_required()
+@admin_required
+def admission_stats():
+    """In-flight and queued work of the OCR and LLM admission pools."""
+    current_app.logger.info("📊 Admission control stats retrieved")
+    return make_response_util(200, message=admission.stats())
+
+
+@model_blueprint.route('/decoder/stats', methods=['GET'])
+@jwt_required()
+@admin_required
+def decoder_stats():
+    """TrOCR decoder steps and tokens per crop, per generation profile."""
+    if not model_registry.ready:
+        return make_response_util(200, message={"profiles": {}})
+    
+    current_app.logger.info("📊 TrOCR decoder stats retrieved")
+    return make_response_util(200, message={"profiles": model_registry.ocr.decode_stats()})
+
+
+@model_blueprint.route('/cache', methods=['GET'])
+@jwt_required()
+@admin_required
+def cache_stats():
+    """Hit/miss counters of the OCR result, TrOCR crop and explanation caches."""
+    current_app.logger.info("📊 Cache stats retrieved")
+    crops = model_registry.ocr.crop_cache_stats() if model_registry.ready else None
+    return make_response_util(200, message={"ocr": ocr_cache.stats(), "crops": crops, "explanations": model_registry.llm.cache_stats()})
+
+
+@model_blueprint.route('/cache', methods=['DELETE'])
+@jwt_required()
+@admin_required
+def flush_cache():
+    """Drop every cached OCR result, recognized crop and prescription explanation."""
+    ocr_cache.clear()
+    if model_registry.ready and model_registry.ocr.crop_cache is not None:
+        model_registry.ocr.crop_cache.clear()
+    model_registry.llm.cache.clear()
+    current_app.logger.info("🧹 OCR, crop and explanation caches flushed")
+    return make_response_util(200, message="Caches flushed successfully")
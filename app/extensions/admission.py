@@ -0,0 +1,216 @@
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+from ml_model.metrics import ADMISSION_REJECTED, ADMISSION_WAIT_SECONDS
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot start within its deadline; `retry_after` is in seconds"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("owner", "cost", "granted", "event")
+
+    def __init__(self, owner, cost):
+        self.owner = owner
+        self.cost = cost
+        self.granted = False
+        self.event = threading.Event()
+
+
+class Ticket:
+    """Admitted work; `release` (idempotent) hands its cost back to the pool."""
+
+    def __init__(self, pool, cost):
+        self.pool = pool
+        self.cost = cost
+        self.started = time.perf_counter()
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.pool.release(self)
+
+
+class AdmissionPool:
+    """In-flight work budget of one model, with a bounded wait queue served round-robin per owner.
+
+    A request costs at least one unit. It starts right away when its cost fits the free
+    capacity and nobody is waiting; otherwise it queues behind its owner's earlier requests,
+    and owners take turns, so one client flooding the queue only delays itself. Requests
+    that would wait longer than `max_wait` (estimated from recent unit hold times) are
+    rejected up front, the others give up when their deadline passes.
+    """
+
+    # Weight of the newest hold time in the seconds-per-unit moving average
+    EWMA_ALPHA = 0.2
+
+    def __init__(self, name, capacity, max_queue, max_queue_per_owner, max_wait):
+        self.name = name
+        self.capacity = capacity
+        self.max_queue = max_queue
+        self.max_queue_per_owner = max_queue_per_owner
+        self.max_wait = max_wait
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._queued_cost = 0
+        self._queued = 0
+        # owner -> deque of waiters; the first owner is next in turn
+        self._queues = OrderedDict()
+        self._seconds_per_unit = None
+        self.admitted = 0
+        self.rejected = 0
+
+    def admit(self, owner, cost):
+        """Block until `cost` units are granted and return the Ticket, or raise AdmissionRejected."""
+        cost = min(max(1, int(cost)), self.capacity)
+        started = time.perf_counter()
+        with self._lock:
+            if not self._queues and self._in_flight + cost <= self.capacity:
+                return self._grant_now(cost, started)
+
+            owner_queue = self._queues.get(owner)
+            if self._queued >= self.max_queue or (owner_queue and len(owner_queue) >= self.max_queue_per_owner):
+                raise self._reject("queue_full", f"Too many {self.name} requests waiting, try again later", self._estimate_wait(cost))
+            estimated_wait = self._estimate_wait(cost)
+            if estimated_wait is not None and estimated_wait > self.max_wait:
+                raise self._reject("deadline", f"The {self.name} models are busy for about {estimated_wait:.0f}s, try again later", estimated_wait)
+
+            waiter = _Waiter(owner, cost)
+            self._queues.setdefault(owner, deque()).append(waiter)
+            self._queued += 1
+            self._queued_cost += cost
+
+        waiter.event.wait(self.max_wait)
+        with self._lock:
+            if not waiter.granted:
+                self._remove(waiter)
+                # The expired waiter may have been the head blocking smaller requests
+                self._dispatch()
+                raise self._reject("timeout", f"Timed out waiting for the {self.name} models, try again later", self._estimate_wait(cost))
+        ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - started, pool=self.name)
+        return Ticket(self, cost)
+
+    def release(self, ticket):
+        held = time.perf_counter() - ticket.started
+        with self._lock:
+            self._in_flight -= ticket.cost
+            per_unit = held / ticket.cost
+            if self._seconds_per_unit is None:
+                self._seconds_per_unit = per_unit
+            else:
+                self._seconds_per_unit += self.EWMA_ALPHA * (per_unit - self._seconds_per_unit)
+            self._dispatch()
+
+    def _grant_now(self, cost, started):
+        self._in_flight += cost
+        self.admitted += 1
+        ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - started, pool=self.name)
+        return Ticket(self, cost)
+
+    def _dispatch(self):
+        """Start waiters owner by owner while the next one in turn fits; called with the lock held."""
+        while self._queues:
+            owner, owner_queue = next(iter(self._queues.items()))
+            waiter = owner_queue[0]
+            if self._in_flight + waiter.cost > self.capacity:
+                return
+            owner_queue.popleft()
+            del self._queues[owner]
+            if owner_queue:
+                # Back of the line for this owner's next request
+                self._queues[owner] = owner_queue
+            self._queued -= 1
+            self._queued_cost -= waiter.cost
+            self._in_flight += waiter.cost
+            self.admitted += 1
+            waiter.granted = True
+            waiter.event.set()
+
+    def _remove(self, waiter):
+        owner_queue = self._queues.get(waiter.owner)
+        if owner_queue is None or waiter not in owner_queue:
+            return
+        owner_queue.remove(waiter)
+        if not owner_queue:
+            del self._queues[waiter.owner]
+        self._queued -= 1
+        self._queued_cost -= waiter.cost
+
+    def _estimate_wait(self, cost):
+        """Seconds until `cost` more units could start behind everything admitted or queued; None before any release."""
+        if self._seconds_per_unit is None:
+            return None
+        backlog = self._in_flight + self._queued_cost + cost - self.capacity
+        return max(0.0, backlog * self._seconds_per_unit / self.capacity)
+
+    def _reject(self, reason, message, estimated_wait):
+        self.rejected += 1
+        ADMISSION_REJECTED.inc(pool=self.name, reason=reason)
+        logging.warning(f"🚦 {self.name} request rejected ({reason})")
+        retry_after = max(1, math.ceil(estimated_wait if estimated_wait is not None else self.max_wait))
+        return AdmissionRejected(message, retry_after)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "capacity": self.capacity,
+                "in_flight": self._in_flight,
+                "queued": self._queued,
+                "queued_cost": self._queued_cost,
+                "waiting_owners": len(self._queues),
+                "seconds_per_unit": round(self._seconds_per_unit, 4) if self._seconds_per_unit is not None else None,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+            }
+
+
+class AdmissionController:
+    """Admission control for the model routes, one AdmissionPool per model: `ocr` and `llm`.
+
+    Costs are in units of OCR_ADMISSION_UNIT_KB of request body for OCR and of
+    LLM_ADMISSION_UNIT_CHARS of prescription text for the LLM. Limits are per process,
+    like the models themselves.
+    """
+
+    OCR_CAPACITY = int(os.getenv("OCR_ADMISSION_CAPACITY") or 8)
+    OCR_UNIT_BYTES = int(os.getenv("OCR_ADMISSION_UNIT_KB") or 1024) * 1024
+    LLM_CAPACITY = int(os.getenv("LLM_ADMISSION_CAPACITY") or 16)
+    LLM_UNIT_CHARS = int(os.getenv("LLM_ADMISSION_UNIT_CHARS") or 500)
+    MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE") or 32)
+    MAX_QUEUE_PER_OWNER = int(os.getenv("ADMISSION_MAX_QUEUE_PER_USER") or 4)
+    MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS") or 10)
+
+    def __init__(self):
+        self.pools = {
+            "ocr": AdmissionPool("ocr", self.OCR_CAPACITY, self.MAX_QUEUE, self.MAX_QUEUE_PER_OWNER, self.MAX_WAIT_SECONDS),
+            "llm": AdmissionPool("llm", self.LLM_CAPACITY, self.MAX_QUEUE, self.MAX_QUEUE_PER_OWNER, self.MAX_WAIT_SECONDS),
+        }
+
+    def init_app(self, app):
+        app.extensions['admission'] = self
+
+    def ocr_cost(self, request_bytes):
+        return math.ceil((request_bytes or 0) / self.OCR_UNIT_BYTES)
+
+    def llm_cost(self, text):
+        return math.ceil(len(text or "") / self.LLM_UNIT_CHARS)
+
+    def admit(self, pool, owner, cost):
+        return self.pools[pool].admit(owner, cost)
+
+    def stats(self):
+        return {name: pool.stats() for name, pool in self.pools.items()}
+
+
+admission = AdmissionController()
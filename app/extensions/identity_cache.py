@@ -0,0 +1,59 @@
+import logging
+import os
+
+from ml_model.cache import LRUCache
+from .db import db
+from ..models.dbSchema import Admin, User
+
+
+class IdentityCache:
+    """Caches the active status of token subjects, so protected routes can check revocation without a query.
+
+    Entries are keyed by (user_type, id), since users and admins have separate id spaces,
+    and expire after IDENTITY_CACHE_TTL_SECONDS. `invalidate` drops an entry right away in
+    this process; other processes see a change once their entry expires.
+    """
+
+    TTL_SECONDS = int(os.getenv("IDENTITY_CACHE_TTL_SECONDS") or 30)
+    MAX_ENTRIES = int(os.getenv("IDENTITY_CACHE_MAX_ENTRIES") or 10000)
+    MODELS = {"user": User, "admin": Admin}
+
+    def __init__(self):
+        self._cache = LRUCache(max_entries=self.MAX_ENTRIES, ttl=self.TTL_SECONDS)
+
+    def init_app(self, app, jwt):
+        app.extensions['identity_cache'] = self
+        jwt.token_in_blocklist_loader(self.token_revoked)
+
+    def is_active(self, user_type, user_id):
+        """Whether the account exists and is active; unknown user types are never active."""
+        key = (user_type, str(user_id))
+        active = self._cache.get(key)
+        if active is None:
+            Model = self.MODELS.get(user_type)
+            if Model is None:
+                return False
+            active = bool(db.session.query(Model.is_active).filter(Model.id == user_id).scalar())
+            self._cache.set(key, active)
+        return active
+
+    def remember(self, user_type, user_id, active):
+        self._cache.set((user_type, str(user_id)), bool(active))
+
+    def invalidate(self, user_type, user_id):
+        self._cache.pop((user_type, str(user_id)))
+        logging.info(f"🧹 Identity cache entry dropped for {user_type} {user_id}")
+
+    def invalidate_many(self, user_type, user_ids):
+        for user_id in user_ids:
+            self._cache.pop((user_type, str(user_id)))
+        logging.info(f"🧹 Identity cache entries dropped for {len(user_ids)} {user_type}s")
+
+    def token_revoked(self, jwt_header, jwt_payload):
+        return not self.is_active(jwt_payload.get('user_type'), jwt_payload['sub'])
+
+    def stats(self):
+        return self._cache.stats()
+
+
+identity_cache = IdentityCache()
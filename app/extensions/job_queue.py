@@ -0,0 +1,222 @@
+import hashlib
+import hmac
+import ipaddress
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import urllib.parse
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from .db import db
+from ..models.dbSchema import Job
+
+
+class JobQueueFullError(RuntimeError):
+    """Raised when JOB_MAX_PENDING jobs are already waiting or running in this process"""
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Callbacks go to the exact URL given; a redirect could lead anywhere, internal hosts included."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+def check_callback_address(url):
+    """Raise ValueError unless every address the callback host resolves to is a public one."""
+    parts = urllib.parse.urlsplit(url)
+    try:
+        infos = socket.getaddrinfo(parts.hostname, parts.port or (443 if parts.scheme == "https" else 80), proto=socket.IPPROTO_TCP)
+    except socket.gaierror as e:
+        raise ValueError(f"Callback host {parts.hostname} does not resolve: {e}")
+    for info in infos:
+        # Drop the IPv6 zone index, e.g. fe80::1%eth0
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        if not address.is_global or address.is_multicast:
+            raise ValueError(f"Callback host {parts.hostname} resolves to a non-public address ({address})")
+
+
+class JobQueue:
+    """Runs submitted OCR jobs on a bounded local thread pool, with their state in the `jobs` table.
+
+    Handlers are registered per job kind and return a JSON-serializable result. Jobs are
+    claimed with a conditional UPDATE, so several processes sharing the database never
+    run the same job twice. On startup, queued jobs and jobs abandoned by a dead process
+    are run again, up to JOB_MAX_ATTEMPTS times.
+    """
+
+    WORKERS = int(os.getenv("JOB_WORKERS") or 2)
+    MAX_PENDING = int(os.getenv("JOB_MAX_PENDING") or 100)
+    MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS") or 3)
+    # A running job not touched for this long is considered abandoned, whatever host ran it
+    STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS") or 900)
+    CALLBACK_SECRET = os.getenv("JOB_CALLBACK_SECRET")
+    CALLBACK_TIMEOUT_SECONDS = 5
+    CALLBACK_RETRIES = 3
+    _callback_opener = urllib.request.build_opener(_NoRedirect)
+
+    def __init__(self):
+        self.app = None
+        self._handlers = {}
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def init_app(self, app, start=True):
+        self.app = app
+        app.extensions['jobs'] = self
+        if start:
+            self.start()
+
+    def start(self):
+        """Start the worker threads and pick up unfinished jobs; the master of a pre-forking server leaves this to its workers."""
+        self._executor = ThreadPoolExecutor(max_workers=self.WORKERS, thread_name_prefix="job-worker")
+        with self.app.app_context():
+            self.requeue_unfinished()
+
+    def register(self, kind, handler):
+        self._handlers[kind] = handler
+
+    @property
+    def worker_id(self):
+        # Read on every claim: the pid changes when a pre-forking server forks this process
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def submit(self, owner, kind, image_bytes, options, callback_url=None):
+        """Store a new job and queue it; raises JobQueueFullError when the pool is saturated."""
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        self._reserve()
+        try:
+            job = Job(id=uuid.uuid4().hex, owner=owner, kind=kind, options=json.dumps(options),
+                      input_image=image_bytes, callback_url=callback_url)
+            db.session.add(job)
+            db.session.commit()
+        except Exception:
+            self._release()
+            raise
+        self._executor.submit(self._run, job.id)
+        logging.info(f"📨 Job {job.id} ({kind}) queued")
+        return job
+
+    def requeue_unfinished(self):
+        """Queue again every job left queued, or running in a process that no longer exists."""
+        requeued = 0
+        for job in Job.query.filter(Job.status.in_(("queued", "running"))).all():
+            if job.status == "running":
+                if not self._abandoned(job):
+                    continue
+                job.status = "queued"
+                job.worker = None
+                db.session.commit()
+            self._reserve(force=True)
+            self._executor.submit(self._run, job.id)
+            requeued += 1
+        if requeued:
+            logging.info(f"♻️ Requeued {requeued} unfinished jobs")
+
+    def _abandoned(self, job):
+        host, _, pid = (job.worker or "").rpartition(":")
+        if host == socket.gethostname() and pid.isdigit() and int(pid) != os.getpid():
+            try:
+                os.kill(int(pid), 0)
+            except ProcessLookupError:
+                return True
+            except PermissionError:
+                pass
+        last_seen = job.updated_at or job.started_at or job.created_at
+        return last_seen < datetime.utcnow() - timedelta(seconds=self.STALE_SECONDS)
+
+    def _reserve(self, force=False):
+        with self._lock:
+            if not force and self._pending >= self.MAX_PENDING:
+                raise JobQueueFullError(f"{self._pending} jobs are already pending, try again later")
+            self._pending += 1
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    def _claim(self, job_id):
+        claimed = Job.query.filter_by(id=job_id, status="queued").update(
+            {"status": "running", "worker": self.worker_id, "started_at": datetime.utcnow(), "attempts": Job.attempts + 1},
+            synchronize_session=False,
+        )
+        db.session.commit()
+        return claimed == 1
+
+    def _run(self, job_id):
+        try:
+            with self.app.app_context():
+                if not self._claim(job_id):
+                    return
+                job = db.session.get(Job, job_id)
+                started = time.perf_counter()
+                if job.attempts > self.MAX_ATTEMPTS:
+                    job.status = "failed"
+                    job.error = f"Gave up after {self.MAX_ATTEMPTS} interrupted attempts"
+                else:
+                    try:
+                        job.result = json.dumps(self._handlers[job.kind](job))
+                        job.status = "succeeded"
+                    except Exception as e:
+                        logging.error(f"❌ Job {job_id} failed: {str(e)}")
+                        job.status = "failed"
+                        job.error = str(e)
+                job.finished_at = datetime.utcnow()
+                job.input_image = None
+                db.session.commit()
+                logging.info(f"✅ Job {job_id} {job.status} in {time.perf_counter() - started:.2f}s")
+
+                if job.callback_url:
+                    job.callback_status = self._notify(job)
+                    db.session.commit()
+        except Exception as e:
+            logging.error(f"❌ Job worker error on {job_id}: {str(e)}")
+        finally:
+            self._release()
+
+    def _notify(self, job):
+        """POST the outcome to the job's callback URL; returns the delivery status to store.
+
+        Loopback, private, link-local and other non-public addresses are refused, whatever
+        the host allowlist says, and redirects are not followed.
+        """
+        try:
+            check_callback_address(job.callback_url)
+        except ValueError as e:
+            logging.warning(f"⚠️ Callback for job {job.id} refused: {str(e)}")
+            return f"refused: {e}"[:255]
+
+        payload = json.dumps({"job_id": job.id, "status": job.status, "error": job.error}).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if self.CALLBACK_SECRET:
+            signature = hmac.new(self.CALLBACK_SECRET.encode("utf-8"), payload, hashlib.sha256).hexdigest()
+            headers["X-Signature-SHA256"] = signature
+
+        error = None
+        for attempt in range(self.CALLBACK_RETRIES):
+            try:
+                callback = urllib.request.Request(job.callback_url, data=payload, headers=headers, method="POST")
+                with self._callback_opener.open(callback, timeout=self.CALLBACK_TIMEOUT_SECONDS) as response:
+                    return f"delivered ({response.status})"
+            except Exception as e:
+                error = str(e)
+                if attempt < self.CALLBACK_RETRIES - 1:
+                    time.sleep(2 ** attempt)
+        logging.warning(f"⚠️ Callback for job {job.id} failed: {error}")
+        return f"failed: {error}"[:255]
+
+    def stats(self):
+        counts = dict(db.session.query(Job.status, db.func.count(Job.id)).group_by(Job.status).all())
+        with self._lock:
+            return {"workers": self.WORKERS, "pending_in_process": self._pending, "max_pending": self.MAX_PENDING, "jobs": counts}
+
+
+job_queue = JobQueue()
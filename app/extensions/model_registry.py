@@ -0,0 +1,151 @@
+import logging
+import os
+import threading
+import time
+
+
+class ModelRegistry:
+    """Owns the OCR and LLM models so that creating the app never waits for them.
+
+    `MODEL_LOADING` picks the strategy:
+    - background (default): load and warm up on a thread; OCR routes answer 503 until ready
+    - lazy: load on the first request that needs the OCR models
+    - eager: load inside `create_app`, before the app serves anything
+    - none: no models at all (auth-only workers, see `create_app`)
+
+    Under a pre-forking server (`prefork`, see gunicorn.conf.py) eager loading happens in
+    the master, so the workers share the weights' memory pages; warming up and starting
+    the scheduler threads wait for `after_fork` in each worker, since threads do not
+    survive a fork. Background loading becomes eager there for the same reason.
+    """
+
+    MODES = ("background", "lazy", "eager", "none")
+
+    def __init__(self):
+        self.mode = None
+        self._lock = threading.Lock()
+        self._llm_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = None
+        self._error = None
+        self._load_seconds = None
+        self.prefork = False
+        self._deferred = False
+
+        self._ocr = None
+        self._scheduler = None
+        self._llm = None
+
+    def init_app(self, app, mode=None, prefork=False):
+        mode = (mode or os.getenv("MODEL_LOADING") or "background").lower()
+        if mode not in self.MODES:
+            raise ValueError(f"MODEL_LOADING must be one of {', '.join(self.MODES)}")
+        if prefork and mode == "background":
+            logging.info("🍴 Pre-fork serving: loading the models before forking instead of on a thread")
+            mode = "eager"
+        self.mode = mode
+        self.prefork = prefork
+        app.extensions['models'] = self
+
+        if mode == "eager":
+            self.load()
+        elif mode == "background":
+            self.start_background_load()
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def start_background_load(self):
+        with self._lock:
+            if not self.ready and (self._thread is None or not self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._load_quietly, name="model-loader", daemon=True)
+                self._thread.start()
+
+    def _load_quietly(self):
+        try:
+            self.load()
+        except Exception as e:
+            logging.error(f"❌ Background model loading failed: {str(e)}")
+
+    def load(self):
+        """Load, wire and warm up the OCR models once; later calls return immediately."""
+        if self.ready:
+            return
+        with self._lock:
+            if self.ready:
+                return
+            started = time.perf_counter()
+            try:
+                # Imported here so model-free workers never pay for torch/transformers
+                from ml_model.optical_character_recognition import OpticalCharacterRecognition
+
+                logging.info("⏳ Loading OCR models")
+                ocr = OpticalCharacterRecognition()
+                # Loaded by the master of a pre-forking server, the rest runs in each worker
+                self._deferred = self.prefork and self.mode == "eager"
+                if not self._deferred:
+                    self._start(ocr)
+                self._ocr = ocr
+            except Exception as e:
+                self._error = str(e)
+                raise
+
+            self._error = None
+            self._load_seconds = time.perf_counter() - started
+            self._ready.set()
+            logging.info(f"✅ OCR models ready in {self._load_seconds:.1f}s")
+
+    def _start(self, ocr):
+        """Warm-up and scheduler threads, in the process that serves requests."""
+        from ml_model.inference_scheduler import InferenceScheduler
+
+        if os.getenv("MODEL_WARMUP", "true").lower() in ("1", "true"):
+            ocr.warm_up()
+        # Optional cross-request micro-batching; both objects expose the same inference calls
+        if os.getenv("INFERENCE_SCHEDULER", "").lower() in ("1", "true"):
+            self._scheduler = InferenceScheduler(ocr)
+
+    def after_fork(self):
+        """Finish in a forked worker what the master deferred; a no-op otherwise."""
+        if self._deferred and self._ocr is not None:
+            self._deferred = False
+            self._start(self._ocr)
+
+    @property
+    def ocr(self):
+        self.load()
+        return self._ocr
+
+    @property
+    def scheduler(self):
+        self.load()
+        return self._scheduler
+
+    @property
+    def ocr_engine(self):
+        """The scheduler when enabled, otherwise the OCR models themselves."""
+        self.load()
+        return self._scheduler or self._ocr
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            with self._llm_lock:
+                if self._llm is None:
+                    from ml_model.large_language_models import Llama3_1_70B
+                    self._llm = Llama3_1_70B()
+        return self._llm
+
+    def status(self):
+        return {
+            "ready": self.ready,
+            "mode": self.mode,
+            "loading": self._thread is not None and self._thread.is_alive(),
+            "load_seconds": round(self._load_seconds, 2) if self._load_seconds is not None else None,
+            "backend": self._ocr.backend if self._ocr is not None else None,
+            "error": self._error,
+        }
+
+
+model_registry = ModelRegistry()
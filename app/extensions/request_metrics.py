@@ -0,0 +1,57 @@
+import os
+import time
+
+from flask import g, request
+
+from ml_model.metrics import REQUESTS, REQUEST_SECONDS, end_request_stages, request_stages, start_request_stages
+
+
+class RequestMetrics:
+    """Request counters and latency histograms, plus the opt-in `Server-Timing` response header.
+
+    The header lists every stage timed on the request's thread (summed per stage) and
+    `total`. Clients opt in with `X-Server-Timing: 1`; SERVER_TIMING=1 sends it on every
+    response. Streamed responses only report the stages done before streaming starts.
+    """
+
+    ALWAYS = os.getenv("SERVER_TIMING", "").lower() in ("1", "true")
+
+    def init_app(self, app):
+        app.extensions['request_metrics'] = self
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def _before_request(self):
+        g.metrics_started = time.perf_counter()
+        g.metrics_stages_token = start_request_stages()
+
+    def _after_request(self, response):
+        started = g.get('metrics_started')
+        if started is None:
+            return response
+        seconds = time.perf_counter() - started
+        endpoint = request.endpoint or "unmatched"
+        REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+        REQUEST_SECONDS.observe(seconds, endpoint=endpoint)
+
+        if self.ALWAYS or request.headers.get('X-Server-Timing') == '1':
+            totals = {}
+            for stage, stage_seconds in request_stages():
+                totals[stage] = totals.get(stage, 0.0) + stage_seconds
+            entries = [f"{stage};dur={stage_seconds * 1000:.1f}" for stage, stage_seconds in totals.items()]
+            entries.append(f"total;dur={seconds * 1000:.1f}")
+            response.headers['Server-Timing'] = ", ".join(entries)
+        return response
+
+    def _teardown_request(self, exception=None):
+        token = g.pop('metrics_stages_token', None)
+        if token is not None:
+            try:
+                end_request_stages(token)
+            except ValueError:
+                # Streamed responses finish in another context; the value is simply dropped
+                pass
+
+
+request_metrics = RequestMetrics()
@@ -1,33 +1,96 @@
-from pydantic import BaseModel, field_validator, ConfigDict
+from pydantic import BaseModel, field_validator, model_validator, ConfigDict, Field, HttpUrl, PrivateAttr
+from typing import ClassVar, List, Literal, Optional
+import os
 import base64
 import binascii
     
+# JPEG, PNG and GIF (in order); a basic check that filters out random strings,
+# it does not guarantee the image is valid
+IMAGE_SIGNATURES = (b'\xff\xd8\xff', b'\x89PNG\r\n\x1a\n', b'GIF87a', b'GIF89a')
+
+def check_image_signature(data):
+    """Check that decoded bytes start with a known image file signature"""
+    if not bytes(data[:8]).startswith(IMAGE_SIGNATURES):
+        raise ValueError("Decoded string is not a recognized image format")
+    return data
+    
 class InputImageBase64(BaseModel):
     model_config = ConfigDict(extra="forbid")
     
     image: str
     
-    @field_validator('image')
-    def validate_base64_image(cls, v):
+    # Decoded once during validation and reused by the route
+    _image_bytes: bytes = PrivateAttr(default=b"")
+    
+    @model_validator(mode='after')
+    def validate_base64_image(self):
         """Check if the image is base64 encoded or just a random string"""
         try:
-            # Try to decode the string as base64
-            decoded = base64.b64decode(v)
-            
-            # Check if the decoded string starts with known image file signatures
-            # This is a basic check and doesn't guarantee the image is valid,
-            # but it helps filter out random strings
-            if decoded.startswith(b'\xff\xd8\xff') or \
-                decoded.startswith(b'\x89PNG\r\n\x1a\n') or \
-                decoded.startswith(b'GIF87a') or  \
-                decoded.startswith(b'GIF89a'):  # JPEG or PNG or GIF (in order)
-                return v
-            else:
-                raise ValueError("Decoded string is not a recognized image format")
+            decoded = base64.b64decode(self.image)
         except binascii.Error:
             raise ValueError("Invalid base64 encoding")
+        try:
+            self._image_bytes = check_image_signature(decoded)
         except Exception as e:
             raise ValueError(f"Error validating base64 image: {str(e)}")
+        return self
+    
+    @property
+    def image_bytes(self) -> bytes:
+        return self._image_bytes
+        
+class InputImageBase64Batch(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    
+    MAX_IMAGES: ClassVar[int] = int(os.getenv("OCR_BATCH_MAX_IMAGES") or 20)
+    
+    # Each entry is validated on its own so one bad page does not fail the bundle
+    images: List[str] = Field(..., min_length=1)
+    
+    @field_validator('images')
+    def check_batch_size(cls, v):
+        if len(v) > cls.MAX_IMAGES:
+            raise ValueError(f"At most {cls.MAX_IMAGES} images are allowed per batch")
+        return v
+        
+class OCROutputOptions(BaseModel):
+    """Query-string options shaping the OCR reply; detections are always returned"""
+    model_config = ConfigDict(extra="forbid")
+    
+    include_image: bool = True
+    image_format: Literal["jpeg", "webp"] = "jpeg"
+    image_quality: Optional[int] = Field(None, ge=1, le=100)
+    image_max_side: Optional[int] = Field(None, ge=64)
+    image_delivery: Literal["inline", "url"] = "inline"
+        
+class JobRequest(OCROutputOptions):
+    """Query-string parameters of an asynchronous OCR job"""
+    
+    # JOB_CALLBACK_ALLOWED_HOSTS (comma separated) lists where callbacks may go; callbacks are off without it
+    CALLBACK_ALLOWED_HOSTS: ClassVar[List[str]] = [host.strip().lower() for host in (os.getenv("JOB_CALLBACK_ALLOWED_HOSTS") or "").split(",") if host.strip()]
+    
+    kind: Literal["ocr", "pipeline"] = "ocr"
+    callback_url: Optional[HttpUrl] = None
+    
+    @field_validator('callback_url')
+    def check_callback_host(cls, v):
+        if v is None:
+            return v
+        if not cls.CALLBACK_ALLOWED_HOSTS:
+            raise ValueError("Job callbacks are disabled on this server")
+        if (v.host or "").lower() not in cls.CALLBACK_ALLOWED_HOSTS:
+            raise ValueError(f"Callback host {v.host} is not allowed")
+        return v
+    
+    @model_validator(mode='after')
+    def check_image_delivery(self):
+        # Fetch URLs are tied to the requester's session, jobs store the image inline instead
+        if self.image_delivery == "url":
+            raise ValueError("image_delivery=url is not available for jobs")
+        return self
+    
+    def ocr_options(self):
+        return OCROutputOptions(**self.model_dump(include=set(OCROutputOptions.model_fields)))
         
 class PrescriptionText(BaseModel):
     model_config = ConfigDict(extra="forbid")
@@ -1,4 +1,10 @@
 from pydantic import BaseModel, field_validator, Field, ConfigDict
+from datetime import datetime, timezone
+from typing import ClassVar, List, Literal, Optional
+import base64
+import binascii
+import json
+import os
 import re
 from enum import Enum
 from ..utilities import make_response_util
@@ -46,4 +52,67 @@ class Login(BaseModel):
         if v not in ['user', 'admin']:
             raise ValueError("User type must be 'user' or 'admin'")
         return v
-    
\ No newline at end of file
+
+
+class UserListQuery(BaseModel):
+    """Query-string parameters of the user listing"""
+    model_config = ConfigDict(extra="forbid")
+    
+    MAX_LIMIT: ClassVar[int] = int(os.getenv("USERS_PAGE_MAX_SIZE") or 1000)
+    
+    limit: int = Field(100, ge=1)
+    # Opaque position returned as next_cursor by the previous page
+    cursor: Optional[str] = None
+    active: Optional[bool] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    format: Literal["json", "jsonl"] = "json"
+    
+    @field_validator('limit')
+    def check_limit(cls, v):
+        if v > cls.MAX_LIMIT:
+            raise ValueError(f"At most {cls.MAX_LIMIT} users are allowed per page")
+        return v
+    
+    @field_validator('cursor')
+    def check_cursor(cls, v):
+        if v is not None:
+            cls.decode_cursor(v)
+        return v
+    
+    @field_validator('created_after', 'created_before')
+    def to_naive_utc(cls, v):
+        # created_at is stored as naive UTC
+        if v is not None and v.tzinfo is not None:
+            v = v.astimezone(timezone.utc).replace(tzinfo=None)
+        return v
+    
+    @staticmethod
+    def encode_cursor(created_at, user_id):
+        raw = json.dumps([created_at.isoformat(), user_id]).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+    
+    @staticmethod
+    def decode_cursor(cursor):
+        """(created_at, id) of the last user of the previous page"""
+        try:
+            created_at, user_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            return datetime.fromisoformat(created_at), int(user_id)
+        except (binascii.Error, TypeError, ValueError):
+            raise ValueError("Invalid cursor")
+    
+    def after(self):
+        return self.decode_cursor(self.cursor) if self.cursor else None
+
+class BulkDeleteUsers(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    
+    MAX_IDS: ClassVar[int] = int(os.getenv("USERS_BULK_DELETE_MAX") or 1000)
+    
+    ids: List[int] = Field(..., min_length=1)
+    
+    @field_validator('ids')
+    def check_ids(cls, v):
+        if len(v) > cls.MAX_IDS:
+            raise ValueError(f"At most {cls.MAX_IDS} users can be deleted per request")
+        return list(dict.fromkeys(v))
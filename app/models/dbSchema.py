@@ -6,12 +6,17 @@ class BaseUser:
     username = db.Column(db.String(80), unique=True, nullable=False)
     password = db.Column(db.String(255), nullable=False)
     is_active = db.Column(db.Boolean, default=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
 
 class User(BaseUser, db.Model):
     __tablename__ = 'users'
+    # Keyset pages of the user listing, in (created_at, id) order, with and without the active filter
+    __table_args__ = (
+        db.Index('ix_users_created_at_id', 'created_at', 'id'),
+        db.Index('ix_users_is_active_created_at_id', 'is_active', 'created_at', 'id'),
+    )
     deleted_at = db.Column(db.DateTime)
     deleted_by = db.Column(db.Integer, db.ForeignKey('admins.id'))
 
@@ -23,4 +28,29 @@ class Admin(BaseUser, db.Model):
     deleted_users = db.relationship('User', backref='deleted_by_admin', foreign_keys=[User.deleted_by])
 
     def __repr__(self):
-        return f'<Admin {self.username}>'
\ No newline at end of file
+        return f'<Admin {self.username}>'
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    id = db.Column(db.String(32), primary_key=True)
+    # "<user_type>:<id>" of the submitter, users and admins have separate id spaces
+    owner = db.Column(db.String(40), nullable=False, index=True)
+    kind = db.Column(db.String(20), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)
+    options = db.Column(db.Text, nullable=False, default='{}')
+    # Kept until the job finishes so an interrupted job can be run again
+    input_image = db.Column(db.LargeBinary)
+    result = db.Column(db.Text)
+    error = db.Column(db.Text)
+    callback_url = db.Column(db.String(2048))
+    callback_status = db.Column(db.String(255))
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    # "<hostname>:<pid>" of the process running the job
+    worker = db.Column(db.String(300))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.status}>'
@@ -0,0 +1,67 @@
+"""Hooks for serving the app with a pre-forking server, see gunicorn.conf.py.
+
+The master builds the app once (PREFORK=1, models loaded eagerly) and forks the workers,
+which then share the model weights' memory pages copy-on-write instead of loading one
+copy each. Anything holding threads, sockets or file handles is created after the fork.
+"""
+import gc
+import logging
+import os
+
+from .extensions.db import db
+from .extensions.job_queue import job_queue
+from .extensions.model_registry import model_registry
+
+TORCH_THREADS_PER_WORKER = int(os.getenv("TORCH_THREADS_PER_WORKER") or 0)
+SMAPS_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty", "Swap")
+
+
+def prefork_enabled():
+    return os.getenv("PREFORK", "").lower() in ("1", "true")
+
+
+def before_fork():
+    """Called once in the master, after the app is loaded and before the first fork."""
+    gc.collect()
+    # Objects moved to the permanent generation are never scanned again, so the collector
+    # in a worker does not write to (and copy) the pages the master filled
+    gc.freeze()
+
+
+def after_fork(app, workers):
+    """Called in every worker right after the fork, before it accepts requests."""
+    if model_registry.mode not in (None, "none"):
+        from ml_model.inference_executor import InferenceExecutor
+
+        # Workers share the cores; without this every worker starts one intra-op thread per core
+        InferenceExecutor.set_cpu_budget(TORCH_THREADS_PER_WORKER or (os.cpu_count() or 1) // workers)
+
+    with app.app_context():
+        # Pooled connections were opened by the master; drop them without closing its sockets
+        db.engine.dispose(close=False)
+    if model_registry.mode not in (None, "none"):
+        model_registry.after_fork()
+        job_queue.start()
+
+    usage = memory_usage(os.getpid())
+    if usage:
+        logging.info(f"🍴 Worker {os.getpid()} ready: {usage['unique_mb']} MB unique, {usage['shared_mb']} MB shared")
+
+
+def memory_usage(pid):
+    """Memory of a process from /proc/<pid>/smaps_rollup, in MB; None where that file does not exist (non-Linux)."""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+
+    kb = {}
+    for line in lines:
+        name, _, value = line.partition(":")
+        if name in SMAPS_FIELDS:
+            kb[name] = int(value.split()[0])
+    mb = {name.lower() + "_mb": round(value / 1024, 1) for name, value in kb.items()}
+    mb["unique_mb"] = round((kb.get("Private_Clean", 0) + kb.get("Private_Dirty", 0)) / 1024, 1)
+    mb["shared_mb"] = round((kb.get("Shared_Clean", 0) + kb.get("Shared_Dirty", 0)) / 1024, 1)
+    return mb
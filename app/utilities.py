@@ -1,6 +1,7 @@
-from flask import jsonify, make_response, request, abort
-from flask_jwt_extended import get_jwt_identity
-from .models import dbSchema
+from flask import jsonify, make_response, request, abort, current_app
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from .extensions.identity_cache import identity_cache
+from .extensions.admission import admission, AdmissionRejected
 from functools import wraps
 import jwt
 import datetime
@@ -10,12 +11,20 @@ import cv2
 import base64
 import io
 import numpy as np
+import json
+import queue
+import threading
 from jwt import ExpiredSignatureError, DecodeError, InvalidTokenError
 from dotenv import load_dotenv 
 load_dotenv()
 import logging
 
 SECRET_KEY = os.getenv("SECRET_KEY")
+MAX_IMAGE_BYTES = int(os.getenv("MAX_IMAGE_MB") or 15) * 1024 * 1024
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_MEGAPIXELS") or 50) * 1000 * 1000
+
+class ImageTooLargeError(ValueError):
+    """Raised when an upload exceeds the configured byte or pixel limits"""
 
 def make_response_util(status_code, message=None, description=None, error=None, additional_headers=None):
     response_content = {'status_code': status_code}
@@ -31,6 +40,54 @@ def make_response_util(status_code, message=None, description=None, error=None,
             response.headers[header] = value
     return response
 
+def format_sse(data, event=None):
+    """Format one Server-Sent Events message with a JSON payload"""
+    message = f"data: {json.dumps(data)}\n\n"
+    if event:
+        message = f"event: {event}\n{message}"
+    return message
+
+class PrefetchedStream:
+    """Consume a generator on a worker thread, so it makes progress while the caller does other work.
+
+    Iterate it to receive the items in order; the generator's exception, if any, is re-raised
+    at the end. `close` stops the worker at its next item and closes the generator.
+    """
+    _END = object()
+
+    def __init__(self, make_generator):
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(make_generator,), daemon=True)
+        self._thread.start()
+
+    def _run(self, make_generator):
+        try:
+            generator = make_generator()
+            try:
+                for item in generator:
+                    if self._stop.is_set():
+                        break
+                    self._queue.put(item)
+            finally:
+                generator.close()
+        except Exception as e:
+            self._queue.put((self._END, e))
+            return
+        self._queue.put((self._END, None))
+
+    def __iter__(self):
+        while True:
+            item = self._queue.get()
+            if isinstance(item, tuple) and len(item) == 2 and item[0] is self._END:
+                if item[1] is not None:
+                    raise item[1]
+                return
+            yield item
+
+    def close(self):
+        self._stop.set()
+
 def generate_token(user):
     payload = {
         "user": user,
@@ -59,19 +116,89 @@ def token_required(f):
 def admin_required(f):
     @wraps(f)
     def decorated_admin_required(*args, **kwargs):
-        current_user_id = get_jwt_identity()
-        admin = dbSchema.Admin.query.get(current_user_id)
-    
-        if not admin or not admin.is_active:
+        # User and admin ids overlap, so the token's user type must be checked as well
+        if get_jwt().get('user_type') != 'admin' or not identity_cache.is_active('admin', get_jwt_identity()):
             abort(403, description="Admin access required")
         return f(*args, **kwargs)
     return decorated_admin_required
 
+def models_ready_required(f):
+    @wraps(f)
+    def decorated_models_ready_required(*args, **kwargs):
+        registry = current_app.extensions['models']
+        if not registry.ready and registry.mode == "background":
+            # Retries a failed background load; no-op while one is running
+            registry.start_background_load()
+            return make_response_util(503, description="OCR models are still loading", error='Service Unavailable',
+                                      additional_headers={'Retry-After': '5'})
+        return f(*args, **kwargs)
+    return decorated_models_ready_required
+
+def current_owner():
+    """"<user_type>:<id>" of the token's account; users and admins have separate id spaces"""
+    return f"{get_jwt().get('user_type')}:{get_jwt_identity()}"
+
+def admission_rejected_response(e):
+    return make_response_util(503, description=str(e), error='Service Unavailable',
+                              additional_headers={'Retry-After': str(e.retry_after)})
+
+def admission_required(pool, cost):
+    """Run the view only once `pool` has capacity for `cost()` units, or answer 503 with Retry-After.
+
+    The units are held until the response is sent, or until a streamed response closes.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_admission_required(*args, **kwargs):
+            try:
+                ticket = admission.admit(pool, current_owner(), cost())
+            except AdmissionRejected as e:
+                return admission_rejected_response(e)
+            try:
+                response = make_response(f(*args, **kwargs))
+            except BaseException:
+                ticket.release()
+                raise
+            if response.is_streamed:
+                response.call_on_close(ticket.release)
+            else:
+                ticket.release()
+            return response
+        return decorated_admission_required
+    return decorator
+
 def base64_to_pil(base64_str):
     """Convert base64 string to PIL Image"""
     img_data = base64.b64decode(base64_str)
+    return bytes_to_pil(img_data)
+
+def bytes_to_pil(img_data):
+    """Convert encoded image bytes to PIL Image"""
     return Image.open(io.BytesIO(img_data))
 
 def pil_to_cv2(pil_image):
     """Convert PIL Image to OpenCV format"""
-    return cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
\ No newline at end of file
+    return cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
+
+def check_image_limits(img_data):
+    """Reject oversized uploads before the full decode; PIL only reads the header here"""
+    if len(img_data) > MAX_IMAGE_BYTES:
+        raise ImageTooLargeError(f"Image is larger than {MAX_IMAGE_BYTES // (1024 * 1024)} MB")
+    try:
+        width, height = Image.open(io.BytesIO(img_data)).size
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning):
+        # PIL's own pixel limit (the warning only when promoted to an error) caught it first
+        raise ImageTooLargeError(f"Image has more than {MAX_IMAGE_PIXELS // (1000 * 1000)} megapixels")
+    if width * height > MAX_IMAGE_PIXELS:
+        raise ImageTooLargeError(f"Image has more than {MAX_IMAGE_PIXELS // (1000 * 1000)} megapixels")
+
+def bytes_to_cv2(img_data):
+    """Decode encoded image bytes straight to a BGR array, with no PIL or intermediate copies"""
+    check_image_limits(img_data)
+    buffer = np.frombuffer(memoryview(img_data), dtype=np.uint8)
+    # Ignore EXIF orientation, like the PIL path did
+    image = cv2.imdecode(buffer, cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION)
+    if image is None:
+        # OpenCV builds without GIF support
+        return pil_to_cv2(bytes_to_pil(img_data).convert("RGB"))
+    return image
\ No newline at end of file
@@ -0,0 +1,71 @@
+"""Micro-benchmark: list-based `filter_similar_boxes` vs array-based `suppress_similar_boxes`.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_nms --boxes 15 50 200 --repeat 20
+"""
+import argparse
+import json
+import timeit
+
+import numpy as np
+
+from ml_model.optical_character_recognition import OCRHelper
+
+
+def random_boxes(n: int, rng: np.random.Generator, width: int = 1200, height: int = 1600) -> np.ndarray:
+    """Line-shaped boxes with many near duplicates, like raw low-confidence YOLO output."""
+    lines = max(1, n // 3)
+    x1 = rng.uniform(0, width * 0.4, lines)
+    y1 = rng.uniform(0, height * 0.9, lines)
+    w = rng.uniform(width * 0.2, width * 0.6, lines)
+    h = rng.uniform(30, 90, lines)
+    base = np.stack([x1, y1, x1 + w, y1 + h], axis=1)
+
+    # Every line is reported about three times with a few pixels of jitter
+    picks = rng.integers(0, lines, n)
+    jitter = rng.normal(0, 4, (n, 4))
+    return (base[picks] + jitter).astype(np.float32)
+
+
+def run_list_helper(boxes: np.ndarray):
+    detection_data = [(box, 0.5, 0) for box in boxes]
+    sorted_detections = sorted(detection_data, key=lambda x: x[0][1])
+    return OCRHelper.filter_similar_boxes(sorted_detections)
+
+
+def run_array_helper(boxes: np.ndarray):
+    return OCRHelper.suppress_similar_boxes(boxes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--boxes", type=int, nargs="+", default=[15, 50, 200, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    results = []
+    for n in args.boxes:
+        boxes = random_boxes(n, rng)
+
+        kept_list = [tuple(box) for box, _, _ in run_list_helper(boxes)]
+        kept_array = [tuple(box) for box in boxes[run_array_helper(boxes)]]
+        if kept_list != kept_array:
+            raise AssertionError(f"Helpers disagree for {n} boxes")
+
+        list_time = min(timeit.repeat(lambda: run_list_helper(boxes), number=1, repeat=args.repeat))
+        array_time = min(timeit.repeat(lambda: run_array_helper(boxes), number=1, repeat=args.repeat))
+        results.append({
+            "boxes": n,
+            "kept": len(kept_array),
+            "filter_similar_boxes_ms": round(list_time * 1000, 3),
+            "suppress_similar_boxes_ms": round(array_time * 1000, 3),
+            "speedup": round(list_time / array_time, 2) if array_time else None,
+        })
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
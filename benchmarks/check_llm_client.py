@@ -0,0 +1,102 @@
+"""Checks of the pooled LLM client's circuit breaker against the local fake OpenAI server.
+
+Usage (from the repository root, no NVIDIA API key needed):
+    python -m benchmarks.check_llm_client
+
+Each check opens the breaker, waits until it is half-open and then makes its single
+probe end without an upstream outcome:
+
+- the probe call times out waiting for an upstream slot while every slot is taken;
+- the probe call fails with an error that is not an upstream error.
+
+In both cases the next call must still get to probe, and succeed. The busy case must
+also answer with a Retry-After hint of the slot wait, not of the breaker reset.
+
+Exits with status 1 and the failed checks when any of them fails.
+"""
+import argparse
+import time
+from typing import List
+
+from benchmarks.fake_openai_server import serve
+from ml_model.errors import CircuitOpenError, UpstreamBusyError
+from ml_model.llm_client import CircuitBreaker, PooledLLMClient
+
+RESET_SECONDS = 0.2
+MESSAGES = [{"role": "user", "content": "resep"}]
+
+
+def half_open_client(base_url: str) -> PooledLLMClient:
+    client = PooledLLMClient(base_url=base_url, api_key="fake")
+    client.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=RESET_SECONDS)
+    client.breaker.record_failure()
+    time.sleep(RESET_SECONDS * 1.5)
+    return client
+
+
+def next_call_probes(client: PooledLLMClient, name: str) -> List[str]:
+    if client.breaker.state != "half_open":
+        return [f"{name}: expected the breaker half-open before the next call, got {client.breaker.state}"]
+    try:
+        text = "".join(client.stream_chat(timeout=10, model="fake", messages=MESSAGES))
+    except CircuitOpenError:
+        return [f"{name}: the next call was rejected, the probe was never given back"]
+    failures = []
+    if not text:
+        failures.append(f"{name}: the probe call streamed no content")
+    if client.breaker.state != "closed":
+        failures.append(f"{name}: expected the breaker closed after a successful probe, got {client.breaker.state}")
+    return failures
+
+
+def check_probe_busy(base_url: str) -> List[str]:
+    client = half_open_client(base_url)
+    for _ in range(client.MAX_CONCURRENCY):
+        client._slots.acquire()
+    try:
+        list(client.stream_chat(timeout=0.3, model="fake", messages=MESSAGES))
+        return ["busy: expected UpstreamBusyError while every slot is taken"]
+    except UpstreamBusyError as e:
+        failures = [] if e.retry_after == 1 else [f"busy: expected Retry-After 1 for a 0.3 s slot wait, got {e.retry_after}"]
+    finally:
+        for _ in range(client.MAX_CONCURRENCY):
+            client._slots.release()
+    return failures + next_call_probes(client, "busy")
+
+
+def check_probe_unexpected_error(base_url: str) -> List[str]:
+    client = half_open_client(base_url)
+    create = client._create_with_retries
+
+    def broken_create(deadline, create_kwargs):
+        raise ValueError("not an upstream error")
+
+    client._create_with_retries = broken_create
+    try:
+        list(client.stream_chat(timeout=10, model="fake", messages=MESSAGES))
+        return ["unexpected error: expected the probe call to raise"]
+    except ValueError:
+        pass
+    finally:
+        client._create_with_retries = create
+    return next_call_probes(client, "unexpected error")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    server = serve("127.0.0.1", 0, first_token_delay_ms=10, token_delay_ms=0)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    failures = check_probe_busy(base_url) + check_probe_unexpected_error(base_url)
+    server.shutdown()
+
+    if failures:
+        for failure in failures:
+            print(f"FAIL {failure}")
+        raise SystemExit(1)
+    print("OK a half-open breaker still probes after a probe that timed out on the slots or failed unexpectedly")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Checks that malformed batch OCR bodies get 400, not 500, with the rate limiter on.
+
+Usage (from the repository root, no model weights needed):
+    python -m benchmarks.check_ocr_batch
+
+Serves the app with the stub models, the way `benchmarks.run_suite` does, but keeps
+rate limiting enabled, so the limiter's cost callback sees every body before the view
+validates it. Bodies that are valid JSON but not an object (a list, a string, a number),
+non-JSON bodies and objects without usable images must all be answered with 400.
+
+Exits with status 1 and the failed checks when any of them fails.
+"""
+import argparse
+import json
+import logging
+import tempfile
+import urllib.error
+import urllib.request
+from typing import List
+
+from benchmarks.run_suite import Client, start_app
+
+BATCH_PATH = "/api/model/ocr/batch"
+BODIES = {
+    "empty JSON array": b"[]",
+    "JSON array": b'[{"images": []}]',
+    "JSON string": b'"images"',
+    "JSON number": b"3",
+    "JSON null": b"null",
+    "not JSON": b"images",
+    "no images": b"{}",
+    "empty images": b'{"images": []}',
+    "images not a list": b'{"images": "abc"}',
+}
+
+
+def post_raw(base_url: str, token: str, body: bytes, timeout: float) -> int:
+    request = urllib.request.Request(base_url + BATCH_PATH, data=body, method="POST",
+                                     headers={"Content-Type": "application/json", "Authorization": f"Bearer {token}"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--timeout", type=float, default=30, help="Client timeout, in seconds")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory(prefix="trxnslate-check-") as workdir:
+        app_args = argparse.Namespace(workdir=workdir, scheduler=False, seed=0, yolo_base_ms=0, yolo_per_image_ms=0,
+                                      trocr_base_ms=0, trocr_per_crop_ms=0)
+        server = start_app(app_args, "http://127.0.0.1:9/v1")
+        base_url = f"http://127.0.0.1:{server.server_port}"
+
+        client = Client(base_url, args.timeout)
+        client.register("batch_check")
+        status, body = client.login("batch_check")
+        if status != 200:
+            raise SystemExit(f"Could not log in the check user (HTTP {status})")
+        token = body["message"]["access_token"]
+
+        # start_app turns rate limiting off; these bodies must get through its cost callback
+        for limiter in server.app.extensions.get('limiter', ()):
+            limiter.enabled = True
+            limiter.reset()
+
+        failures: List[str] = []
+        for name, payload in BODIES.items():
+            status = post_raw(base_url, token, payload, args.timeout)
+            if status != 400:
+                failures.append(f"{name} ({payload.decode()}): expected HTTP 400, got {status}")
+
+        server.shutdown()
+
+    if failures:
+        for failure in failures:
+            print(f"FAIL {failure}")
+        raise SystemExit(1)
+    print(f"OK {len(BODIES)} malformed batch bodies answered with 400 with the rate limiter on")
+
+
+if __name__ == "__main__":
+    main()
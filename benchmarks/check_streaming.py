@@ -0,0 +1,159 @@
+"""End-to-end check of the streaming explanation endpoint against the fake LLM server.
+
+Usage (from the repository root, no model weights or NVIDIA API key needed):
+    python -m benchmarks.check_streaming
+
+Starts `benchmarks.fake_openai_server`, points LLM_BASE_URL at it and serves the app
+with the stub models, the way `benchmarks.run_suite` does. Then it checks that
+`/api/model/generate_prescription_explanations/stream`:
+
+- sends the explanation as `token` events, in order, and ends with one `done` event;
+- cancels the upstream completion when the client disconnects mid-stream, i.e. the
+  fake server sees its stream closed early and not run to the end.
+
+Exits with status 1 and the failed checks when any of them fails.
+"""
+import argparse
+import http.client
+import json
+import logging
+import socket
+import tempfile
+import time
+from typing import Iterator, List, Tuple
+
+from benchmarks.fake_openai_server import EXPLANATION, serve
+from benchmarks.run_suite import Client, start_app
+
+STREAM_PATH = "/api/model/generate_prescription_explanations/stream"
+
+
+class LogCapture(logging.Handler):
+    def __init__(self):
+        super().__init__(level=logging.INFO)
+        self.messages: List[str] = []
+
+    def emit(self, record: logging.LogRecord):
+        self.messages.append(record.getMessage())
+
+
+def open_stream(port: int, token: str, prescription_text: str, timeout: float) -> Tuple[socket.socket, http.client.HTTPResponse]:
+    """POST to the stream endpoint; returns the socket too, since the response of a closing connection owns it."""
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    connection.request("POST", STREAM_PATH, body=json.dumps({"prescription_text": prescription_text}),
+                       headers={"Content-Type": "application/json", "Authorization": f"Bearer {token}"})
+    sock = connection.sock
+    return sock, connection.getresponse()
+
+
+def read_events(response: http.client.HTTPResponse) -> Iterator[Tuple[str, dict]]:
+    """Yield (event, payload) for every Server-Sent Event of the response, as it arrives."""
+    event, data = "message", []
+    while True:
+        line = response.readline()
+        if not line:
+            return
+        line = line.decode("utf-8").rstrip("\r\n")
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+
+
+def check_full_stream(port: int, token: str, timeout: float) -> List[str]:
+    sock, response = open_stream(port, token, "Amoxicillin 500 mg\n3 dd 1 tab pc", timeout)
+    try:
+        if response.status != 200:
+            return [f"stream: expected HTTP 200, got {response.status}"]
+        if not response.getheader("Content-Type", "").startswith("text/event-stream"):
+            return [f"stream: expected text/event-stream, got {response.getheader('Content-Type')}"]
+        events = list(read_events(response))
+    finally:
+        response.close()
+        sock.close()
+
+    failures = []
+    names = [event for event, _ in events]
+    tokens = [payload["content"] for event, payload in events if event == "token"]
+    if not tokens:
+        failures.append(f"stream: no token events, got {names}")
+    elif "".join(tokens).strip() != EXPLANATION:
+        failures.append(f"stream: tokens joined to {''.join(tokens)!r}, expected the fake explanation")
+    if names.count("done") != 1 or names[-1] != "done":
+        failures.append(f"stream: expected one final done event, got {names}")
+    elif "total_ms" not in events[-1][1] or events[-1][1].get("time_to_first_token_ms") is None:
+        failures.append(f"stream: done event without timings: {events[-1][1]}")
+    return failures
+
+
+def check_disconnect(port: int, token: str, llm_server, log: LogCapture, timeout: float) -> List[str]:
+    before = dict(llm_server.streams)
+    # A text not streamed before, so the explanation cache cannot answer it
+    sock, response = open_stream(port, token, "Paracetamol 500 mg\n3 dd 1 tab prn", timeout)
+    first = next(read_events(response), None)
+    # Shut the socket down before the response closes it, so the server sees the disconnect right away
+    sock.shutdown(socket.SHUT_RDWR)
+    response.close()
+    if first is None or first[0] != "token":
+        return [f"disconnect: expected a token event before disconnecting, got {first}"]
+
+    # The app notices on its next write, the fake server on its next write after the app closed upstream
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and llm_server.streams["closed_early"] == before["closed_early"]:
+        time.sleep(0.05)
+
+    failures = []
+    if llm_server.streams["closed_early"] == before["closed_early"]:
+        failures.append(f"disconnect: the upstream stream was not closed early within {timeout} s")
+    if llm_server.streams["completed"] != before["completed"]:
+        failures.append("disconnect: the upstream stream ran to the end")
+    if not any("Client disconnected" in message for message in log.messages):
+        failures.append("disconnect: the app did not log the client disconnect")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-first-token-ms", type=float, default=50)
+    parser.add_argument("--llm-token-ms", type=float, default=100,
+                        help="Delay between tokens; long enough that a disconnect lands mid-stream")
+    parser.add_argument("--timeout", type=float, default=30, help="Client timeout, in seconds")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory(prefix="trxnslate-check-") as workdir:
+        app_args = argparse.Namespace(workdir=workdir, scheduler=False, seed=0, yolo_base_ms=0, yolo_per_image_ms=0,
+                                      trocr_base_ms=0, trocr_per_crop_ms=0)
+        llm_server = serve("127.0.0.1", 0, args.llm_first_token_ms, args.llm_token_ms)
+        server = start_app(app_args, f"http://127.0.0.1:{llm_server.server_address[1]}/v1")
+        log = LogCapture()
+        server.app.logger.setLevel(logging.INFO)
+        server.app.logger.addHandler(log)
+
+        client = Client(f"http://127.0.0.1:{server.server_port}", args.timeout)
+        client.register("stream_check")
+        status, body = client.login("stream_check")
+        if status != 200:
+            raise SystemExit(f"Could not log in the check user (HTTP {status})")
+        token = body["message"]["access_token"]
+
+        failures = check_full_stream(server.server_port, token, args.timeout)
+        failures += check_disconnect(server.server_port, token, llm_server, log, args.timeout)
+
+        server.shutdown()
+        llm_server.shutdown()
+
+    if failures:
+        for failure in failures:
+            print(f"FAIL {failure}")
+        raise SystemExit(1)
+    print("OK token and done events streamed; disconnecting closed the upstream stream")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Accuracy vs latency of the OCR inference backends on a fixed image set.
+
+Usage (from the repository root, with the YOLO weights in ml_model/yolov10/best.pt):
+    python -m benchmarks.compare_backends --images samples/ --backends fp32 int8 bf16 onnx --output report.json
+
+Every backend reads the same images (sorted by file name). Accuracy is measured against
+the fp32 output: the character error rate (CER) of the text and the share of fp32 boxes
+found again (same label, IoU >= 0.5). With `--labels`, a JSON object mapping file names
+to the expected prescription text, the CER against that ground truth is reported too.
+The TrOCR crop cache is off, so every repeat really decodes.
+The onnx backend needs `pip install optimum[onnxruntime] onnx onnxruntime`.
+"""
+import argparse
+import gc
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+from ml_model.optical_character_recognition import OCRHelper, OpticalCharacterRecognition
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def edit_distance(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def character_error_rate(reference: str, hypothesis: str) -> float:
+    return edit_distance(reference, hypothesis) / max(1, len(reference))
+
+
+def box_recall(reference: dict, page: dict, iou_threshold: float = 0.5) -> float:
+    """Share of the reference boxes matched by a box of the same class in `page`."""
+    if not reference["boxes"]:
+        return 1.0
+    if not page["boxes"]:
+        return 0.0
+    iou = OCRHelper.iou_matrix(np.array(reference["boxes"] + page["boxes"], dtype=np.float32))
+    iou = iou[:len(reference["boxes"]), len(reference["boxes"]):]
+    same_class = np.equal.outer(reference["class_ids"], page["class_ids"])
+    return float(((iou >= iou_threshold) & same_class).any(axis=1).mean())
+
+
+def run_backend(backend: str, images: list, repeat: int) -> dict:
+    ocr = OpticalCharacterRecognition(backend=backend)
+    # Every repeat must really decode, not time crop cache hits of the first one
+    ocr.crop_cache = None
+    ocr.warm_up()
+
+    detect_ms, recognize_ms, pages = [], [], []
+    for image in images:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            detections = ocr.predict_yolo([image])
+            detected = time.perf_counter()
+            page = ocr.read_pages([image], detections)[0]
+            finished = time.perf_counter()
+
+            detect_ms.append((detected - started) * 1000)
+            recognize_ms.append((finished - detected) * 1000)
+        pages.append(page)
+
+    result = {"backend": ocr.backend, "pages": pages, "detect_ms": detect_ms, "recognize_ms": recognize_ms}
+    del ocr
+    gc.collect()
+    return result
+
+
+def summarize(values: list) -> dict:
+    return {
+        "mean": round(float(np.mean(values)), 1),
+        "p50": round(float(np.percentile(values, 50)), 1),
+        "p95": round(float(np.percentile(values, 95)), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", required=True, help="Directory with the fixed image set")
+    parser.add_argument("--labels", help="JSON file mapping image file names to the expected text")
+    parser.add_argument("--backends", nargs="+", default=["fp32", "int8", "bf16", "onnx"],
+                        choices=OpticalCharacterRecognition.BACKENDS)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per image")
+    parser.add_argument("--output", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    names = sorted(name for name in os.listdir(args.images) if name.lower().endswith(IMAGE_EXTENSIONS))
+    images = [cv2.imread(os.path.join(args.images, name)) for name in names]
+    labels = {}
+    if args.labels:
+        with open(args.labels, encoding="utf-8") as f:
+            labels = json.load(f)
+
+    # fp32 is the accuracy reference, so it always runs first
+    backends = ["fp32"] + [backend for backend in args.backends if backend != "fp32"]
+    runs = [run_backend(backend, images, args.repeat) for backend in backends]
+    reference = runs[0]
+
+    report = []
+    for requested, run in zip(backends, runs):
+        texts = ["\n".join(page["texts"]) for page in run["pages"]]
+        reference_texts = ["\n".join(page["texts"]) for page in reference["pages"]]
+        row = {
+            "backend": requested,
+            "effective_backend": run["backend"],
+            "images": len(images),
+            "detect_ms": summarize(run["detect_ms"]),
+            "recognize_ms": summarize(run["recognize_ms"]),
+            "cer_vs_fp32": round(float(np.mean([character_error_rate(ref, hyp) for ref, hyp in zip(reference_texts, texts)])), 4),
+            "box_recall_vs_fp32": round(float(np.mean([box_recall(ref, page) for ref, page in zip(reference["pages"], run["pages"])])), 4),
+        }
+        if labels:
+            scored = [(labels[name], text) for name, text in zip(names, texts) if name in labels]
+            row["cer_vs_labels"] = round(float(np.mean([character_error_rate(ref, hyp) for ref, hyp in scored])), 4) if scored else None
+        report.append(row)
+
+    print("| backend | detect p50 ms | recognize p50 ms | total mean ms | CER vs fp32 | box recall vs fp32 |" + (" CER vs labels |" if labels else ""))
+    print("|---|---|---|---|---|---|" + ("---|" if labels else ""))
+    for row in report:
+        total = row["detect_ms"]["mean"] + row["recognize_ms"]["mean"]
+        line = (f"| {row['effective_backend']} | {row['detect_ms']['p50']} | {row['recognize_ms']['p50']} | {total:.1f} "
+                f"| {row['cer_vs_fp32']} | {row['box_recall_vs_fp32']} |")
+        if labels:
+            line += f" {row['cer_vs_labels']} |"
+        print(line)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
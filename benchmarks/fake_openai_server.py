@@ -0,0 +1,167 @@
+"""Local fake of the OpenAI-compatible chat completions API, for offline checks of the LLM path.
+
+Usage (from the repository root):
+    python -m benchmarks.fake_openai_server --port 8099 --first-token-delay-ms 300 --token-delay-ms 20
+
+Add `--error-rate 0.2 --error-status 429` (or 503) to inject upstream failures.
+
+Then point the API at it before starting it:
+    LLM_BASE_URL=http://127.0.0.1:8099/v1 NVIDIA_API_KEY=fake python run.py
+"""
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logging.basicConfig(format="%(asctime)s - %(levelname)s - %(name)s - %(message)s", level=logging.INFO)
+
+EXPLANATION = (
+    "Amoxicillin adalah antibiotik untuk mengobati infeksi bakteri. "
+    "Obat ini diminum tiga kali sehari setelah makan sesuai petunjuk pada resep. "
+    "Dosis yang tertera adalah 500 mg setiap kali minum sampai obat habis."
+)
+
+
+class FakeChatCompletionsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    settings = {"first_token_delay": 0.3, "token_delay": 0.02, "error_rate": 0.0, "error_status": 503}
+
+    def log_message(self, format, *args):
+        logging.debug(format, *args)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        if random.random() < self.settings["error_rate"]:
+            self._fail(self.settings["error_status"])
+            return
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        model = body.get("model", "fake")
+        tokens = [word + " " for word in EXPLANATION.split(" ")]
+
+        if body.get("stream"):
+            self._stream(completion_id, model, tokens)
+        else:
+            self._complete(completion_id, model, tokens)
+
+    def _fail(self, status):
+        payload = json.dumps({"error": {"message": f"Injected upstream error {status}", "type": "fake_error"}}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        if status == 429:
+            self.send_header("Retry-After", "0.1")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _complete(self, completion_id, model, tokens):
+        time.sleep(self.settings["first_token_delay"] + self.settings["token_delay"] * len(tokens))
+        payload = json.dumps({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}, "finish_reason": "stop"}],
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, completion_id, model, tokens):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        time.sleep(self.settings["first_token_delay"])
+        try:
+            for index, token in enumerate(tokens):
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+                }
+                self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+                if index < len(tokens) - 1:
+                    time.sleep(self.settings["token_delay"])
+            self._write_chunk("data: [DONE]\n\n")
+            self._write_chunk("")
+        except (BrokenPipeError, ConnectionResetError):
+            logging.info("🔌 Client closed the stream early")
+            self.close_connection = True
+            self.server.count_stream("closed_early")
+            return
+        self.server.count_stream("completed")
+
+    def _write_chunk(self, text):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+class FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+        self.streams = {"completed": 0, "closed_early": 0}
+
+    def count_stream(self, outcome):
+        with self._lock:
+            self.streams[outcome] += 1
+
+    def handle_error(self, request, client_address):
+        # Clients dropping idle keep-alive connections is expected here
+        logging.debug(f"Connection from {client_address} closed with an error")
+
+
+def serve(host: str = "127.0.0.1", port: int = 8099, first_token_delay_ms: float = 300, token_delay_ms: float = 20,
+          error_rate: float = 0.0, error_status: int = 503) -> FakeServer:
+    """Start the fake server on a background thread and return it; call `shutdown()` to stop."""
+    handler = type("Handler", (FakeChatCompletionsHandler,), {
+        "settings": {
+            "first_token_delay": first_token_delay_ms / 1000,
+            "token_delay": token_delay_ms / 1000,
+            "error_rate": error_rate,
+            "error_status": error_status,
+        },
+    })
+    server = FakeServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logging.info(f"🧪 Fake OpenAI server listening on http://{host}:{server.server_address[1]}/v1")
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--first-token-delay-ms", type=float, default=300)
+    parser.add_argument("--token-delay-ms", type=float, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, args.first_token_delay_ms, args.token_delay_ms, args.error_rate, args.error_status)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Offline load test of the pooled LLM client against the local fake OpenAI server.
+
+Usage (from the repository root):
+    python -m benchmarks.load_llm_client --requests 200 --concurrency 32 --error-rate 0.1 --error-status 429
+
+Client limits are read from the usual LLM_* environment variables, e.g.
+LLM_MAX_CONCURRENCY=4 LLM_TIMEOUT_SECONDS=5.
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.fake_openai_server import serve
+from ml_model.llm_client import PooledLLMClient
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--first-token-delay-ms", type=float, default=200)
+    parser.add_argument("--token-delay-ms", type=float, default=5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    args = parser.parse_args()
+
+    server = serve("127.0.0.1", args.port, args.first_token_delay_ms, args.token_delay_ms, args.error_rate, args.error_status)
+    client = PooledLLMClient(base_url=f"http://127.0.0.1:{server.server_address[1]}/v1", api_key="fake")
+
+    def one_request(_):
+        started = time.perf_counter()
+        first_token = None
+        try:
+            for _chunk in client.stream_chat(model="fake", messages=[{"role": "user", "content": "resep"}]):
+                if first_token is None:
+                    first_token = time.perf_counter() - started
+            return {"ok": True, "latency": time.perf_counter() - started, "ttft": first_token}
+        except Exception as e:
+            return {"ok": False, "latency": time.perf_counter() - started, "error": type(e).__name__}
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(one_request, range(args.requests)))
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    ok = [r for r in results if r["ok"]]
+    errors = {}
+    for r in results:
+        if not r["ok"]:
+            errors[r["error"]] = errors.get(r["error"], 0) + 1
+
+    def percentiles(values):
+        if not values:
+            return None
+        return {f"p{p}": round(float(np.percentile(values, p)) * 1000, 1) for p in (50, 95, 99)}
+
+    print(json.dumps({
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "succeeded": len(ok),
+        "errors": errors,
+        "throughput_rps": round(len(results) / elapsed, 2),
+        "latency_ms": percentiles([r["latency"] for r in ok]),
+        "ttft_ms": percentiles([r["ttft"] for r in ok if r["ttft"] is not None]),
+        "client": client.stats(),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Unique vs shared memory of a pre-forking server and its workers (Linux only).
+
+Usage (from the repository root, while `gunicorn -c gunicorn.conf.py run:app` is running):
+    python -m benchmarks.memory_report $(pgrep -o -f "gunicorn -c gunicorn.conf.py")
+    python -m benchmarks.memory_report 4242 --json
+
+For the master and every child it prints the resident set (RSS), the proportional set
+(PSS: shared pages divided among the processes mapping them), and the split of RSS into
+pages unique to the process and pages shared with others. With the weights loaded before
+the fork, the workers' model memory shows up as shared and the sum of PSS, the real
+footprint, stays well below the sum of RSS, which is what one copy per worker would cost.
+"""
+import argparse
+import json
+import os
+from typing import List
+
+from app.prefork import memory_usage
+
+
+def child_pids(pid: int) -> List[int]:
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may hold spaces, the fields after its closing parenthesis do not
+                ppid = int(f.read().rpartition(")")[2].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def report(pid: int) -> dict:
+    processes = []
+    for role, process_pid in [("master", pid)] + [("worker", child) for child in child_pids(pid)]:
+        usage = memory_usage(process_pid)
+        if usage is not None:
+            processes.append({"pid": process_pid, "role": role, **usage})
+    if not processes:
+        raise SystemExit(f"No /proc/{pid}/smaps_rollup: is {pid} running, and is this Linux 4.14 or later?")
+
+    totals = {name: round(sum(process[name] for process in processes), 1)
+              for name in ("rss_mb", "pss_mb", "unique_mb", "shared_mb")}
+    return {"processes": processes, "totals": totals}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pid", type=int, help="pid of the gunicorn master")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    result = report(args.pid)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+
+    print(f"{'pid':>8} {'role':<7} {'rss MB':>9} {'pss MB':>9} {'unique MB':>10} {'shared MB':>10}")
+    for process in result["processes"]:
+        print(f"{process['pid']:>8} {process['role']:<7} {process['rss_mb']:>9} {process['pss_mb']:>9} "
+              f"{process['unique_mb']:>10} {process['shared_mb']:>10}")
+    totals = result["totals"]
+    print(f"{'total':>16} {totals['rss_mb']:>9} {totals['pss_mb']:>9} {totals['unique_mb']:>10} {totals['shared_mb']:>10}")
+
+
+if __name__ == "__main__":
+    main()
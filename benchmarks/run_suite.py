@@ -0,0 +1,238 @@
+"""End-to-end HTTP benchmark of the app with stub models, synthetic prescriptions and a fake LLM.
+
+Usage (from the repository root, no model weights or NVIDIA API key needed):
+    python -m benchmarks.run_suite --concurrency 1 4 16 --requests 100 --output bench-$(git rev-parse --short HEAD).json
+
+The real Flask app is served on a local port with YOLO and TrOCR replaced by the stubs in
+`benchmarks.stub_models` and the LLM pointed at `benchmarks.fake_openai_server`, so the
+numbers cover everything this repository does around the models: HTTP and JSON handling,
+image decoding, box filtering, cropping, rendering, caching, the database and JWT auth.
+Every request uses a distinct image, prescription text or username, so the OCR and LLM
+caches only hit when `--distinct-inputs` is lowered on purpose. Rate limiting is disabled.
+
+The report holds one entry per scenario (ocr, explain, register, login) and concurrency,
+with throughput and p50/p95/p99 latency, plus the commit and settings it was measured
+with; compare two reports to spot regressions between commits.
+"""
+import argparse
+import base64
+import json
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.synthetic import encode, generate_prescription
+
+SCENARIOS = ("ocr", "explain", "register", "login")
+PASSWORD = "Bench@Password1"
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def start_app(args, llm_url):
+    """Build the app around the stubs and serve it on a background thread; returns the server."""
+    # Read by the app and the model classes at import time, so they are set before importing them
+    os.environ["MODEL_LOADING"] = "eager"
+    os.environ["MODEL_WARMUP"] = "false"
+    os.environ["LLM_BASE_URL"] = llm_url
+    os.environ.setdefault("NVIDIA_API_KEY", "fake")
+    os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(args.workdir, 'bench.db')}"
+    if args.scheduler:
+        os.environ["INFERENCE_SCHEDULER"] = "true"
+
+    import ml_model.optical_character_recognition as ocr_module
+    from benchmarks.stub_models import StubOpticalCharacterRecognition
+
+    StubOpticalCharacterRecognition.configure(args.yolo_base_ms, args.yolo_per_image_ms,
+                                              args.trocr_base_ms, args.trocr_per_crop_ms, seed=args.seed)
+    ocr_module.OpticalCharacterRecognition = StubOpticalCharacterRecognition
+
+    from werkzeug.serving import make_server
+    from app import create_app
+
+    app = create_app()
+    for limiter in app.extensions.get('limiter', ()):
+        limiter.enabled = False
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    app.logger.setLevel(logging.WARNING)
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class Client:
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url
+        self.timeout = timeout
+
+    def post(self, path, payload, token=None):
+        """POST JSON and return (status, parsed body); HTTP errors are returned, not raised."""
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        request = urllib.request.Request(self.base_url + path, data=json.dumps(payload).encode("utf-8"),
+                                         headers=headers, method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, json.loads(response.read() or b"null")
+        except urllib.error.HTTPError as e:
+            return e.code, None
+
+    def register(self, username):
+        return self.post("/api/auth/register", {"username": username, "password": PASSWORD})
+
+    def login(self, username):
+        return self.post("/api/auth/login", {"username": username, "password": PASSWORD})
+
+
+def build_payloads(scenario, count, args, client, run_id):
+    """Request bodies for one scenario run, built before the clock starts."""
+    distinct = max(1, min(count, args.distinct_inputs or count))
+    if scenario == "ocr":
+        images = [base64.b64encode(encode(generate_prescription(args.lines, seed=args.seed * 100003 + run_id * 1009 + i)[0])).decode("ascii")
+                  for i in range(distinct)]
+        return [{"image": images[i % distinct]} for i in range(count)]
+    if scenario == "explain":
+        texts = []
+        for i in range(distinct):
+            _, lines = generate_prescription(args.lines, seed=args.seed * 100003 + run_id * 1009 + i, width=320, height=240)
+            texts.append(f"Resep #{run_id}-{i}\n" + "\n".join(lines))
+        return [{"prescription_text": texts[i % distinct]} for i in range(count)]
+    if scenario == "register":
+        return [f"bench_{args.seed}_{run_id}_{i}" for i in range(count)]
+    if scenario == "login":
+        usernames = [f"bench_login_{args.seed}_{run_id}_{i}" for i in range(distinct)]
+        for username in usernames:
+            client.register(username)
+        return [usernames[i % distinct] for i in range(count)]
+    raise ValueError(f"Unknown scenario: {scenario}")
+
+
+def run_scenario(scenario, concurrency, args, client, token, run_id):
+    payloads = build_payloads(scenario, args.requests, args, client, run_id)
+
+    def one_request(payload):
+        started = time.perf_counter()
+        try:
+            if scenario == "ocr":
+                status, _ = client.post("/api/model/ocr", payload, token)
+            elif scenario == "explain":
+                status, _ = client.post("/api/model/generate_prescription_explanations", payload, token)
+            elif scenario == "register":
+                status, _ = client.register(payload)
+            else:
+                status, _ = client.login(payload)
+        except Exception as e:
+            status = type(e).__name__
+        return status, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one_request, payloads))
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for status, latency in results if status in (200, 201)]
+    errors = {}
+    for status, _ in results:
+        if status not in (200, 201):
+            errors[str(status)] = errors.get(str(status), 0) + 1
+
+    row = {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": len(results),
+        "ok": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "latency_ms": None,
+    }
+    if latencies:
+        row["latency_ms"] = {
+            "mean": round(float(np.mean(latencies)) * 1000, 1),
+            **{f"p{p}": round(float(np.percentile(latencies, p)) * 1000, 1) for p in (50, 95, 99)},
+        }
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=SCENARIOS)
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=100, help="Requests per scenario and concurrency level")
+    parser.add_argument("--warmup-requests", type=int, default=5, help="Untimed requests before each scenario")
+    parser.add_argument("--lines", type=int, default=6, help="Text lines per synthetic prescription")
+    parser.add_argument("--distinct-inputs", type=int, default=0,
+                        help="Cycle through this many distinct inputs per run (0: all distinct, so no cache hits)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--yolo-base-ms", type=float, default=40)
+    parser.add_argument("--yolo-per-image-ms", type=float, default=60)
+    parser.add_argument("--trocr-base-ms", type=float, default=30)
+    parser.add_argument("--trocr-per-crop-ms", type=float, default=45)
+    parser.add_argument("--llm-first-token-ms", type=float, default=400)
+    parser.add_argument("--llm-token-ms", type=float, default=15)
+    parser.add_argument("--scheduler", action="store_true", help="Serve OCR through the cross-request InferenceScheduler")
+    parser.add_argument("--timeout", type=float, default=120, help="Client timeout per request, in seconds")
+    parser.add_argument("--output", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    from benchmarks.fake_openai_server import serve
+
+    with tempfile.TemporaryDirectory(prefix="trxnslate-bench-") as workdir:
+        args.workdir = workdir
+        llm_server = serve("127.0.0.1", 0, args.llm_first_token_ms, args.llm_token_ms)
+        server = start_app(args, f"http://127.0.0.1:{llm_server.server_address[1]}/v1")
+        client = Client(f"http://127.0.0.1:{server.server_port}", args.timeout)
+
+        client.register("bench_owner")
+        status, body = client.login("bench_owner")
+        if status != 200:
+            raise SystemExit(f"Could not log in the benchmark user (HTTP {status})")
+        token = body["message"]["access_token"]
+
+        results = []
+        run_id = 0
+        for scenario in args.scenarios:
+            if args.warmup_requests:
+                run_id += 1
+                warmup = argparse.Namespace(**{**vars(args), "requests": args.warmup_requests})
+                run_scenario(scenario, 1, warmup, client, token, run_id)
+            for concurrency in args.concurrency:
+                run_id += 1
+                row = run_scenario(scenario, concurrency, args, client, token, run_id)
+                results.append(row)
+                latency = row["latency_ms"] or {}
+                print(f"{scenario:>9} c={concurrency:<3} {row['throughput_rps']:>8} rps  "
+                      f"p50 {latency.get('p50')} ms  p95 {latency.get('p95')} ms  p99 {latency.get('p99')} ms  "
+                      f"errors {row['errors'] or 0}")
+
+        server.shutdown()
+        llm_server.shutdown()
+
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "workdir")}
+    report = {"commit": git_commit(), "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), "config": config, "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
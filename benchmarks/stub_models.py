@@ -0,0 +1,107 @@
+"""Weight-free stand-ins for YOLO and TrOCR with a deterministic latency profile.
+
+`StubOpticalCharacterRecognition` keeps everything of `OpticalCharacterRecognition`
+(including the crop cache) except the two model calls: detection finds the text lines of a synthetic page with a
+row projection, recognition returns a fixed string per crop. Both sleep for
+`base + per item` milliseconds (with seeded jitter) on the inference executor's model
+threads, which, like real inference, releases the GIL while "computing".
+"""
+import hashlib
+import threading
+import time
+from typing import List, Optional
+
+import cv2
+import numpy as np
+import supervision as sv
+
+from ml_model.inference_executor import InferenceExecutor
+from ml_model.metrics import BATCH_SIZE, observe_stage
+from ml_model.optical_character_recognition import OpticalCharacterRecognition
+from benchmarks.synthetic import DOSAGES, DRUGS
+
+
+class LatencyProfile:
+    def __init__(self, base_ms: float, per_item_ms: float, jitter: float = 0.1, seed: int = 0):
+        self.base_ms = base_ms
+        self.per_item_ms = per_item_ms
+        self.jitter = jitter
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+
+    def sleep(self, items: int):
+        with self._lock:
+            factor = 1 + self._rng.uniform(-self.jitter, self.jitter)
+        time.sleep(max(0.0, (self.base_ms + self.per_item_ms * items) * factor / 1000))
+
+
+class StubOpticalCharacterRecognition(OpticalCharacterRecognition):
+    yolo_latency = LatencyProfile(base_ms=40, per_item_ms=60)
+    trocr_latency = LatencyProfile(base_ms=30, per_item_ms=45)
+
+    def __init__(self, backend: Optional[str] = None):
+        self.cwd = "."
+        self.backend = "stub"
+        self.device = "cpu"
+        self.model_trocr = None
+        self.processor_trocr = None
+        self.model_yolo = None
+        self.generation_profiles = self.load_generation_profiles()
+        self._decode_lock = threading.Lock()
+        self._decode_stats = {}
+        self.crop_cache = self.create_crop_cache()
+        self.executor = InferenceExecutor()
+        self.model_version = "stub"
+
+    @classmethod
+    def configure(cls, yolo_base_ms: float, yolo_per_image_ms: float, trocr_base_ms: float, trocr_per_crop_ms: float, seed: int = 0):
+        cls.yolo_latency = LatencyProfile(yolo_base_ms, yolo_per_image_ms, seed=seed)
+        cls.trocr_latency = LatencyProfile(trocr_base_ms, trocr_per_crop_ms, seed=seed + 1)
+
+    def predict_yolo(self, images: List[np.ndarray]) -> List[sv.Detections]:
+        BATCH_SIZE.observe(len(images), model="yolo")
+        started = time.perf_counter()
+        detections_list = [self._find_lines(image) for image in images]
+        self.executor.run("yolo", self.yolo_latency.sleep, len(images))
+        observe_stage("yolo_inference", time.perf_counter() - started)
+        return detections_list
+
+    @staticmethod
+    def _find_lines(image: np.ndarray) -> sv.Detections:
+        """Dark-ink row bands below the letterhead, alternately labelled Prescriptio/Signatura."""
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        ink = gray < 120
+        ink[:170] = False
+        rows = np.flatnonzero(ink.sum(axis=1) > 3)
+
+        boxes = []
+        if rows.size:
+            bands = np.split(rows, np.flatnonzero(np.diff(rows) > 8) + 1)
+            for band in bands:
+                columns = np.flatnonzero(ink[band[0]:band[-1] + 1].any(axis=0))
+                boxes.append([columns[0] - 4, band[0] - 4, columns[-1] + 4, band[-1] + 4])
+
+        xyxy = np.array(boxes, dtype=np.float32).reshape(-1, 4)
+        return sv.Detections(
+            xyxy=xyxy,
+            confidence=np.full(len(xyxy), 0.9, dtype=np.float32),
+            class_id=np.arange(len(xyxy)) % 2,
+        )
+
+    def decode_crops(self, images: List[np.ndarray], profile_names: List[str], max_batch_size: Optional[int] = None) -> List[str]:
+        max_batch_size = max_batch_size or self.TROCR_BATCH_SIZE
+        texts = []
+        for start in range(0, len(images), max_batch_size):
+            chunk = images[start:start + max_batch_size]
+            BATCH_SIZE.observe(len(chunk), model="trocr")
+            started = time.perf_counter()
+            self.trocr_latency.sleep(len(chunk))
+            observe_stage("trocr_generate", time.perf_counter() - started)
+            for crop, profile_name in zip(chunk, profile_names[start:start + max_batch_size]):
+                vocabulary = DOSAGES if profile_name == "Signatura" else DRUGS
+                digest = int(hashlib.md5(np.ascontiguousarray(crop).tobytes()).hexdigest(), 16)
+                texts.append(vocabulary[digest % len(vocabulary)])
+        return texts
+
+    def warm_up(self):
+        pass
@@ -0,0 +1,200 @@
+"""OCR throughput and latency across worker processes, inference threads and torch threads.
+
+Usage (from the repository root, with the YOLO weights in ml_model/yolov10/best.pt):
+    python -m benchmarks.sweep_threads --workers 1 2 4 --inference-threads 1 2 --torch-threads 0 1 2 4 --concurrency 8 --output sweep.json
+
+Every combination gets the same closed-loop load: `--concurrency` client threads, spread
+over the worker processes the way a pre-forking server spreads connections, together
+sending `--requests` OCR calls (YOLO, then TrOCR on every kept line) on synthetic
+prescriptions, or on the images under `--images`. Each worker process loads the models
+once per `--workers` value and keeps them across the thread combinations. Like the server,
+a worker gets cores / workers as its CPU budget; `--torch-threads 0` splits that budget
+evenly between the inference threads (see InferenceExecutor). The TrOCR crop cache is off
+so every request really decodes.
+
+The report lists throughput and p50/p95/p99 latency per combination, with the hardware
+and commit it was measured on; pick the fastest combination that meets your latency
+target and set WEB_WORKERS, INFERENCE_THREADS and TORCH_THREADS accordingly.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+from benchmarks.run_suite import git_commit
+from benchmarks.synthetic import generate_prescription
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+# State of a worker process, set once by `_init_worker`
+_worker_ocr = None
+_worker_images = None
+_worker_barrier = None
+
+
+def load_images(args: argparse.Namespace) -> List[np.ndarray]:
+    if args.images:
+        names = sorted(name for name in os.listdir(args.images) if name.lower().endswith(IMAGE_EXTENSIONS))
+        return [cv2.imread(os.path.join(args.images, name)) for name in names]
+    return [generate_prescription(args.lines, seed=args.seed * 1009 + i)[0] for i in range(args.distinct_images)]
+
+
+def _init_worker(backend: Optional[str], images: List[np.ndarray], barrier):
+    global _worker_ocr, _worker_images, _worker_barrier
+    from ml_model.optical_character_recognition import OpticalCharacterRecognition
+
+    _worker_ocr = OpticalCharacterRecognition(backend=backend)
+    _worker_ocr.crop_cache = None
+    _worker_images = images
+    _worker_barrier = barrier
+
+
+def _ocr(image: np.ndarray):
+    return _worker_ocr.read_pages([image], _worker_ocr.predict_yolo([image]))
+
+
+def _run_load(cpu_budget: int, inference_threads: int, torch_threads: int, clients: int, requests: int, warmup: int) -> dict:
+    """Swap in an executor with the given threads, then send this worker's share of the load once every worker is ready."""
+    from ml_model.inference_executor import InferenceExecutor
+
+    InferenceExecutor.set_cpu_budget(cpu_budget)
+    _worker_ocr.executor.shutdown()
+    _worker_ocr.executor = InferenceExecutor(threads=inference_threads, torch_threads=torch_threads or None)
+    for image in _worker_images[:warmup]:
+        _ocr(image)
+
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def client(index: int):
+        for request in range(index, requests, clients):
+            started = time.perf_counter()
+            try:
+                _ocr(_worker_images[request % len(_worker_images)])
+            except Exception as e:
+                with lock:
+                    errors.append(type(e).__name__)
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    _worker_barrier.wait()
+    started = time.perf_counter()
+    if clients:
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            list(pool.map(client, range(clients)))
+    return {
+        "latencies": latencies,
+        "errors": errors,
+        "elapsed": time.perf_counter() - started,
+        "torch_threads": _worker_ocr.executor.torch_threads,
+    }
+
+
+def split(total: int, parts: int) -> List[int]:
+    return [total // parts + (part < total % parts) for part in range(parts)]
+
+
+def summarize(workers: int, inference_threads: int, outcomes: List[dict], args: argparse.Namespace) -> dict:
+    latencies = [latency for outcome in outcomes for latency in outcome["latencies"]]
+    errors = {}
+    for outcome in outcomes:
+        for error in outcome["errors"]:
+            errors[error] = errors.get(error, 0) + 1
+    elapsed = max(outcome["elapsed"] for outcome in outcomes)
+    torch_threads = outcomes[0]["torch_threads"]
+
+    row = {
+        "workers": workers,
+        "inference_threads": inference_threads,
+        "torch_threads": torch_threads,
+        "total_torch_threads": workers * inference_threads * torch_threads,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "ok": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "latency_ms": None,
+    }
+    if latencies:
+        row["latency_ms"] = {
+            "mean": round(float(np.mean(latencies)) * 1000, 1),
+            **{f"p{p}": round(float(np.percentile(latencies, p)) * 1000, 1) for p in (50, 95, 99)},
+        }
+    return row
+
+
+def main():
+    from ml_model.optical_character_recognition import OpticalCharacterRecognition
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2], help="Worker processes, like WEB_WORKERS")
+    parser.add_argument("--inference-threads", nargs="+", type=int, default=[1, 2], help="Model threads per worker, like INFERENCE_THREADS")
+    parser.add_argument("--torch-threads", nargs="+", type=int, default=[0],
+                        help="Intra-op threads per model thread, like TORCH_THREADS (0: cores / workers / inference threads)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Client threads in total, spread over the workers")
+    parser.add_argument("--requests", type=int, default=64, help="OCR requests per combination, in total")
+    parser.add_argument("--warmup-requests", type=int, default=2, help="Untimed requests per worker before each combination")
+    parser.add_argument("--images", help="Directory of prescription images (default: synthetic ones)")
+    parser.add_argument("--distinct-images", type=int, default=8, help="Synthetic images to cycle through")
+    parser.add_argument("--lines", type=int, default=6, help="Text lines per synthetic prescription")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backend", choices=OpticalCharacterRecognition.BACKENDS, help="Overrides OCR_BACKEND")
+    parser.add_argument("--output", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    import torch
+
+    images = load_images(args)
+    cores = os.cpu_count() or 1
+    # Spawned, not forked: torch and its thread pools are not fork-safe
+    context = get_context("spawn")
+
+    results = []
+    for workers in args.workers:
+        barrier = context.Barrier(workers)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(args.backend, images, barrier)) as pool:
+            for inference_threads in args.inference_threads:
+                for torch_threads in args.torch_threads:
+                    # One task per worker; the barrier holds each worker to exactly one of them
+                    futures = [
+                        pool.submit(_run_load, max(1, cores // workers), inference_threads, torch_threads, clients, requests, args.warmup_requests)
+                        for clients, requests in zip(split(args.concurrency, workers), split(args.requests, workers))
+                    ]
+                    row = summarize(workers, inference_threads, [future.result() for future in futures], args)
+                    results.append(row)
+                    latency = row["latency_ms"] or {}
+                    print(f"workers {workers:<2} inference threads {inference_threads:<2} torch threads {row['torch_threads']:<3} "
+                          f"{row['throughput_rps']:>8} rps  p50 {latency.get('p50')} ms  p95 {latency.get('p95')} ms  "
+                          f"p99 {latency.get('p99')} ms  errors {row['errors'] or 0}")
+
+    best = max(results, key=lambda row: row["throughput_rps"] or 0)
+    print(f"Highest throughput: {best['workers']} workers x {best['inference_threads']} inference threads x "
+          f"{best['torch_threads']} torch threads, {best['throughput_rps']} rps")
+
+    config = {key: value for key, value in vars(args).items() if key != "output"}
+    report = {
+        "commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "hardware": {"cpu_count": cores, "torch": torch.__version__, "torch_default_threads": torch.get_num_threads()},
+        "config": config,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Deterministic synthetic prescriptions: alternating drug (R/) and dosage (S) lines on a paper-like background."""
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+DRUGS = ["Amoxicillin 500 mg", "Paracetamol 500 mg", "Ibuprofen 400 mg", "Cetirizine 10 mg", "Omeprazole 20 mg",
+         "Metformin 500 mg", "Amlodipine 5 mg", "Ambroxol 30 mg", "Dexamethasone 0.5 mg", "Loratadine 10 mg"]
+DOSAGES = ["S 3 dd 1 tab pc", "S 2 dd 1 tab ac", "S 1 dd 1 caps", "S 3 dd 1 prn", "S 2 dd 2 tab pc"]
+
+
+def generate_prescription(lines: int = 6, seed: int = 0, width: int = 1240, height: int = 1754) -> Tuple[np.ndarray, List[str]]:
+    """A BGR page (A4 at 150 dpi by default) with `lines` handwriting-ish text lines, and the texts written on it."""
+    rng = np.random.default_rng(seed)
+    image = np.full((height, width, 3), 245, dtype=np.uint8)
+    noise = rng.normal(0, 6, (height, width, 1))
+    image = np.clip(image + noise, 0, 255).astype(np.uint8)
+
+    cv2.putText(image, "dr. Sintetis, Sp.PD", (60, 120), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (60, 60, 60), 2)
+    cv2.line(image, (60, 150), (width - 60, 150), (90, 90, 90), 2)
+
+    texts = []
+    line_height = max(40, (height - 260) // max(lines, 1))
+    for index in range(lines):
+        if index % 2 == 0:
+            text = f"R/ {DRUGS[int(rng.integers(len(DRUGS)))]} no. {int(rng.integers(5, 30))}"
+        else:
+            text = DOSAGES[int(rng.integers(len(DOSAGES)))]
+        x = 80 + int(rng.integers(0, 60))
+        y = 220 + index * line_height + int(rng.integers(0, 10))
+        scale = float(rng.uniform(1.1, 1.5))
+        color = tuple(int(c) for c in rng.integers(10, 60, 3))
+        cv2.putText(image, text, (x, y), cv2.FONT_HERSHEY_SCRIPT_SIMPLEX, scale, color, 2, cv2.LINE_AA)
+        texts.append(text)
+    return image, texts
+
+
+def encode(image: np.ndarray, extension: str = ".jpg") -> bytes:
+    ok, encoded = cv2.imencode(extension, image)
+    if not ok:
+        raise ValueError(f"Could not encode synthetic image as {extension}")
+    return encoded.tobytes()
@@ -0,0 +1,36 @@
+"""Multi-worker production serving: `gunicorn -c gunicorn.conf.py run:app`.
+
+The app, OCR models included, is built once in the master (preload_app) and the workers
+are forked from it, so the model weights are shared copy-on-write instead of loaded once
+per worker. Each worker serves WEB_THREADS requests at a time and gives its inference
+threads TORCH_THREADS_PER_WORKER cores (default: cores / workers). See app/prefork.py.
+"""
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+# Read by create_app when run.py is imported below, by the master
+os.environ["PREFORK"] = "1"
+os.environ.setdefault("MODEL_LOADING", "eager")
+
+bind = f"{os.getenv('FLASK_RUN_HOST') or '0.0.0.0'}:{os.getenv('FLASK_RUN_PORT') or 8000}"
+workers = int(os.getenv("WEB_WORKERS") or 2)
+worker_class = "gthread"
+threads = int(os.getenv("WEB_THREADS") or 4)
+preload_app = True
+# Also covers the warm-up each worker runs after the fork
+timeout = int(os.getenv("WEB_TIMEOUT_SECONDS") or 120)
+graceful_timeout = 30
+
+
+def when_ready(server):
+    from app.prefork import before_fork
+
+    before_fork()
+
+
+def post_fork(server, worker):
+    from app.prefork import after_fork
+
+    after_fork(worker.app.wsgi(), server.cfg.workers)
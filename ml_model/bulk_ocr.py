@@ -0,0 +1,277 @@
+"""Bulk OCR of an image directory or tarball, outside the HTTP API.
+
+Usage (from the repository root, with the YOLO weights in ml_model/yolov10/best.pt):
+    python -m ml_model.bulk_ocr scans/ --output scans.jsonl --workers 4
+    python -m ml_model.bulk_ocr archive-2023.tar.gz --output 2023.jsonl --explain --llm-concurrency 4
+
+Images are streamed from the source (a directory, read recursively in path order, or a
+tar archive, read sequentially) and spread over `--workers` processes, each loading the
+OCR models once. Every finished image is appended to the output as one JSON line:
+
+    {"source": "2023/0001.jpg", "status": "ok", "prescription_text": "...", "detections": [...],
+     "explanation": "...", "model_version": "...", "ocr_ms": 812.4}
+
+The output is also the checkpoint: running the same command again skips sources that
+already have an "ok" line, retries failed ones and, with `--explain`, only asks the LLM
+for the ones still missing an explanation. Lines are written in completion order and a
+later line for a source supersedes earlier ones. An annotated image that could not be
+written is reported as "annotated_error" on its "ok" line, and not retried.
+"""
+import argparse
+import json
+import logging
+import os
+import signal
+import tarfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logging.basicConfig(format="%(asctime)s - %(levelname)s - %(name)s - %(message)s", level=logging.INFO)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp", ".tif", ".tiff")
+
+# The OCR models of a worker process, loaded once by `_init_worker`
+_worker_ocr = None
+
+
+def iter_images(source: str) -> Iterator[Tuple[str, bytes]]:
+    """(name, encoded bytes) of every image in a directory or tar archive, without loading them all."""
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            paths.extend(os.path.join(root, name) for name in files if name.lower().endswith(IMAGE_EXTENSIONS))
+        for path in sorted(paths):
+            with open(path, "rb") as f:
+                yield os.path.relpath(path, source), f.read()
+    elif tarfile.is_tarfile(source):
+        # Stream mode reads the archive front to back once, so compressed archives are never seeked
+        with tarfile.open(source, mode="r|*") as archive:
+            for member in archive:
+                if member.isfile() and member.name.lower().endswith(IMAGE_EXTENSIONS):
+                    yield member.name, archive.extractfile(member).read()
+    else:
+        raise ValueError(f"{source} is neither a directory nor a tar archive")
+
+
+def load_checkpoint(output: str) -> Dict[str, dict]:
+    """Latest record per source in an existing output file, dropping a line cut off by a crash."""
+    records = {}
+    if not os.path.exists(output):
+        return records
+
+    with open(output, "rb+") as f:
+        data = f.read()
+        complete = data.rfind(b"\n") + 1
+        if complete < len(data):
+            logging.warning(f"⚠️ Dropping an incomplete last line of {output}")
+            f.truncate(complete)
+
+    for line in data[:complete].splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        records[record["source"]] = record
+    return records
+
+
+def annotated_path(annotated_dir: str, name: str) -> Optional[str]:
+    """Where the annotated copy of `name` goes, or None when the name would land outside `annotated_dir`."""
+    relative = os.path.normpath(os.path.splitext(name)[0] + ".jpg")
+    # Tar member names are untrusted: absolute paths and ".." must not escape the output directory
+    if os.path.isabs(relative) or relative.split(os.sep)[0] == os.pardir:
+        return None
+    root = os.path.abspath(annotated_dir)
+    path = os.path.join(root, relative)
+    return path if os.path.commonpath([root, path]) == root else None
+
+
+def _init_worker(backend: Optional[str], threads: int):
+    global _worker_ocr
+    from ml_model.inference_executor import InferenceExecutor
+    from ml_model.optical_character_recognition import OpticalCharacterRecognition
+
+    # Workers share the cores; without this every process starts one intra-op thread per core
+    InferenceExecutor.set_cpu_budget(threads)
+    # Ctrl+C is handled by the parent, which stops handing out work
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker_ocr = OpticalCharacterRecognition(backend=backend)
+
+
+def _ocr_batch(batch: List[Tuple[str, bytes]], annotated_dir: Optional[str]) -> List[dict]:
+    """OCR several images in one YOLO call and one TrOCR call; undecodable images get an error record."""
+    ocr = _worker_ocr
+    started = time.perf_counter()
+
+    records, names, images = [], [], []
+    for name, data in batch:
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION)
+        if image is None:
+            records.append({"source": name, "status": "error", "error": "Could not decode image"})
+        else:
+            names.append(name)
+            images.append(image)
+    if not images:
+        return records
+
+    try:
+        pages = ocr.read_pages(images, ocr.predict_yolo(images))
+    except Exception as e:
+        return records + [{"source": name, "status": "error", "error": str(e)} for name in names]
+
+    ocr_ms = round((time.perf_counter() - started) * 1000 / len(images), 1)
+    for name, image, page in zip(names, images, pages):
+        record = {
+            "source": name,
+            "status": "ok",
+            "prescription_text": "\n".join(page["texts"]),
+            "detections": ocr.describe_page(page),
+            "model_version": ocr.model_version,
+            "ocr_ms": ocr_ms,
+        }
+        if annotated_dir:
+            path = annotated_path(annotated_dir, name)
+            if path is None:
+                logging.warning(f"⚠️ Not writing the annotated image of {name}: the name points outside --annotated-dir")
+            else:
+                try:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    with open(path, "wb") as f:
+                        f.write(ocr.render_page(image, page))
+                except OSError as e:
+                    # Disk full or no permission: this image keeps its OCR result, the rest of the batch is unaffected
+                    logging.error(f"❌ Could not write the annotated image of {name}: {str(e)}")
+                    record["annotated_error"] = str(e)
+        records.append(record)
+    return records
+
+
+class BulkOCR:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.written = 0
+        self.failed = 0
+        self.started = time.perf_counter()
+        self.llm = None
+        if args.explain:
+            from ml_model.large_language_models import Llama3_1_70B
+            self.llm = Llama3_1_70B()
+
+    def explain(self, record: dict) -> dict:
+        record = dict(record)
+        record.pop("explanation_error", None)
+        try:
+            record["explanation"] = self.llm.analyze_prescription(record["prescription_text"])
+        except Exception as e:
+            record["explanation_error"] = str(e)
+        return record
+
+    def needs_explanation(self, record: dict) -> bool:
+        return self.llm is not None and "explanation" not in record and bool(record["prescription_text"].strip())
+
+    def write(self, out, record: dict):
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+        self.written += 1
+        if record["status"] != "ok" or "explanation_error" in record or "annotated_error" in record:
+            self.failed += 1
+        if self.written % self.args.progress_every == 0:
+            rate = self.written / (time.perf_counter() - self.started)
+            logging.info(f"📈 {self.written} records written ({self.failed} with errors), {rate:.1f}/s")
+
+    def run(self):
+        args = self.args
+        checkpoint = load_checkpoint(args.output)
+        done = {source for source, record in checkpoint.items() if record["status"] == "ok"}
+        # OCR is done for these, only the explanation is missing
+        to_explain = [record for record in checkpoint.values() if record["status"] == "ok" and self.needs_explanation(record)]
+        if checkpoint:
+            logging.info(f"♻️ Resuming: {len(done)} images already done, {len(to_explain)} waiting for an explanation")
+
+        threads = args.threads_per_worker or max(1, (os.cpu_count() or 1) // args.workers)
+        # Spawned, not forked: torch and its thread pools are not fork-safe
+        ocr_pool = ProcessPoolExecutor(max_workers=args.workers, mp_context=get_context("spawn"),
+                                       initializer=_init_worker, initargs=(args.backend, threads))
+        llm_pool = ThreadPoolExecutor(max_workers=args.llm_concurrency, thread_name_prefix="bulk-llm") if self.llm else None
+        # Bounds the images held in memory between the reader, the workers and the LLM stage
+        max_in_flight = args.workers * 2
+
+        pending = {}
+        with open(args.output, "a", encoding="utf-8") as out:
+            try:
+                for record in to_explain:
+                    pending[llm_pool.submit(self.explain, record)] = "llm"
+
+                batch = []
+                images = iter_images(args.source)
+                exhausted = False
+                while not exhausted or batch or pending:
+                    while not exhausted and len(pending) < max_in_flight:
+                        item = next(images, None)
+                        if item is None:
+                            exhausted = True
+                        elif item[0] not in done:
+                            batch.append(item)
+                        if batch and (exhausted or len(batch) >= args.batch_size):
+                            pending[ocr_pool.submit(_ocr_batch, batch, args.annotated_dir)] = "ocr"
+                            batch = []
+                    if not pending:
+                        continue
+
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        stage = pending.pop(future)
+                        if stage == "llm":
+                            self.write(out, future.result())
+                            continue
+                        for record in future.result():
+                            if record["status"] == "ok" and self.needs_explanation(record):
+                                pending[llm_pool.submit(self.explain, record)] = "llm"
+                            else:
+                                self.write(out, record)
+            except KeyboardInterrupt:
+                logging.warning("🛑 Interrupted, finished records are saved; run the same command to resume")
+                raise
+            except BrokenProcessPool:
+                logging.error("❌ An OCR worker process died (see its error above), finished records are saved")
+                raise SystemExit(1)
+            finally:
+                ocr_pool.shutdown(wait=False, cancel_futures=True)
+                if llm_pool:
+                    llm_pool.shutdown(wait=False, cancel_futures=True)
+
+        elapsed = time.perf_counter() - self.started
+        logging.info(f"✅ {self.written} records written to {args.output} in {elapsed:.1f}s ({self.failed} with errors)")
+
+
+def main():
+    from ml_model.optical_character_recognition import OpticalCharacterRecognition
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="Directory of images or a tar archive (.tar, .tar.gz, .tar.bz2, .tar.xz)")
+    parser.add_argument("--output", required=True, help="JSONL file to append results to; also the resume checkpoint")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 4),
+                        help="OCR worker processes, each holding its own copy of the models")
+    parser.add_argument("--threads-per-worker", type=int, help="torch threads per worker (default: cores / workers)")
+    parser.add_argument("--batch-size", type=int, default=4, help="Images per YOLO call and per TrOCR call")
+    parser.add_argument("--backend", choices=OpticalCharacterRecognition.BACKENDS, help="Overrides OCR_BACKEND")
+    parser.add_argument("--annotated-dir", help="Also write the annotated images (JPEG) under this directory")
+    parser.add_argument("--explain", action="store_true", help="Add the LLM explanation of every text (needs NVIDIA_API_KEY)")
+    parser.add_argument("--llm-concurrency", type=int, default=4, help="Explanations requested at the same time")
+    parser.add_argument("--progress-every", type=int, default=100, help="Log progress every N records")
+    args = parser.parse_args()
+
+    try:
+        BulkOCR(args).run()
+    except KeyboardInterrupt:
+        raise SystemExit(130)
+
+
+if __name__ == "__main__":
+    main()
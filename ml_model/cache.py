@@ -0,0 +1,327 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+logging.basicConfig(format="%(asctime)s - %(levelname)s - %(name)s - %(message)s", level=logging.INFO)
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU cache bounded by entry count and, optionally, by size.
+
+    `sizeof` measures a value for the `max_bytes` bound; `ttl` (seconds) expires entries.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: Optional[int] = None, ttl: Optional[float] = None,
+                 sizeof: Optional[Callable[[Any], int]] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof or (lambda value: 0)
+
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and entry[2] < time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: Hashable, value: Any):
+        size = self.sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, expires_at)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or (self.max_bytes is not None and self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            self._remove(key)
+            return entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: Hashable):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class NearDuplicateCache:
+    """Thread-safe LRU cache keyed by (group, 64-bit perceptual hash) that also matches near duplicates.
+
+    `get` returns the value of the stored hash of the same group closest in Hamming distance,
+    if it is within `max_distance` bits. Lookups compare against every entry at once with
+    numpy, which stays well under a millisecond for a few thousand entries.
+    """
+
+    def __init__(self, max_entries: int, max_distance: int):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+
+        self._hashes = np.zeros(max_entries, dtype=np.uint64)
+        self._groups = np.zeros(max_entries, dtype=np.int64)
+        self._occupied = np.zeros(max_entries, dtype=bool)
+        self._values: list = [None] * max_entries
+        # slot -> None in least to most recently used order; key -> slot
+        self._order: "OrderedDict[int, None]" = OrderedDict()
+        self._slots: Dict[Tuple[int, int], int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Tuple[int, int], default: Any = None) -> Any:
+        group, phash = key
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None and self.max_distance > 0 and self._order:
+                distances = np.unpackbits((self._hashes ^ np.uint64(phash)).view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+                candidates = self._occupied & (self._groups == group) & (distances <= self.max_distance)
+                if candidates.any():
+                    slot = int(np.argmin(np.where(candidates, distances, 65)))
+                    self.near_hits += 1
+            if slot is None:
+                self.misses += 1
+                return default
+            self._order.move_to_end(slot)
+            self.hits += 1
+            return self._values[slot]
+
+    def set(self, key: Tuple[int, int], value: Any):
+        group, phash = key
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                if len(self._order) < self.max_entries:
+                    slot = len(self._order)
+                else:
+                    slot, _ = self._order.popitem(last=False)
+                    del self._slots[(int(self._groups[slot]), int(self._hashes[slot]))]
+                    self.evictions += 1
+                self._slots[key] = slot
+                self._hashes[slot] = phash
+                self._groups[slot] = group
+                self._occupied[slot] = True
+            self._values[slot] = value
+            self._order[slot] = None
+            self._order.move_to_end(slot)
+
+    def clear(self):
+        with self._lock:
+            self._occupied[:] = False
+            self._values = [None] * self.max_entries
+            self._order.clear()
+            self._slots.clear()
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._order),
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "max_distance": self.max_distance,
+            }
+
+
+class SQLiteCache:
+    """Disk tier: JSON values in a SQLite file, evicting least recently used rows past `max_bytes`."""
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self._connect()
+        # A SQLite connection must not be used across a fork; children open their own
+        os.register_at_fork(after_in_child=self._connect)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_entries_accessed_at ON entries (accessed_at)")
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _connect(self):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return default
+            self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any):
+        payload = json.dumps(value).encode("utf-8")
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, payload, len(payload), time.time()),
+            )
+            self._evict()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed_at").fetchall():
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self.evictions += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.execute("VACUUM")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "bytes": total,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class TieredCache:
+    """Memory LRU in front of an optional disk tier; disk hits are promoted to memory."""
+
+    def __init__(self, memory: LRUCache, disk: Optional[SQLiteCache] = None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return default if value is None else value
+
+    def set(self, key: str, value: Any):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+        logging.info("🧹 Cache cleared")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats() if self.disk is not None else None,
+        }
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key onto one in-flight execution.
+
+    The first caller runs `fn`; callers arriving while it runs wait for, and share, its result.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"in_flight": len(self._calls), "coalesced": self.coalesced}
@@ -0,0 +1,14 @@
+class UpstreamUnavailableError(Exception):
+    """Base of the errors raised before calling upstream; `retry_after` is in seconds."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(UpstreamUnavailableError, RuntimeError):
+    """Raised without calling upstream while the circuit breaker is open."""
+
+
+class UpstreamBusyError(UpstreamUnavailableError, TimeoutError):
+    """Raised when no upstream slot frees up before the request deadline."""
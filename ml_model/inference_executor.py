@@ -0,0 +1,121 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import torch
+
+from ml_model.metrics import INFERENCE_QUEUE_SECONDS
+
+logging.basicConfig(format="%(asctime)s - %(levelname)s - %(name)s - %(message)s", level=logging.INFO)
+
+
+class InferenceExecutor:
+    """Fixed pool of model threads that runs the torch calls of `OpticalCharacterRecognition`.
+
+    Request threads hand each model call to `run` and wait for it, so however many requests
+    are in flight, at most `threads` model calls run at once, each with `torch_threads`
+    intra-op threads. Together they stay within the process's CPU budget instead of every
+    request thread starting a torch thread pool as large as the machine.
+
+    Only leaf calls (one YOLO forward, one TrOCR decode) should go through `run`; a call
+    made from a model thread runs inline rather than waiting for a free model thread.
+    """
+
+    THREADS = int(os.getenv("INFERENCE_THREADS") or 1)
+    TORCH_THREADS = int(os.getenv("TORCH_THREADS") or 0)
+    TORCH_INTEROP_THREADS = int(os.getenv("TORCH_INTEROP_THREADS") or 1)
+    # Cores this process may use; a pre-forking server or a bulk worker lowers it to its share
+    cpu_budget = os.cpu_count() or 1
+
+    def __init__(self, threads: Optional[int] = None, torch_threads: Optional[int] = None):
+        self.threads = threads or self.THREADS
+        self._torch_threads = torch_threads or self.TORCH_THREADS
+        self.configure_interop()
+
+        # Threads start on the first call, so an executor built before a fork starts its threads in the child
+        self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="inference", initializer=self._init_thread)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    @classmethod
+    def set_cpu_budget(cls, cores: int):
+        cls.cpu_budget = max(1, cores)
+
+    @classmethod
+    def configure_interop(cls):
+        if torch.get_num_interop_threads() == cls.TORCH_INTEROP_THREADS:
+            return
+        try:
+            torch.set_num_interop_threads(cls.TORCH_INTEROP_THREADS)
+        except RuntimeError:
+            # Only settable once per process, before any inter-op parallel work
+            logging.warning(f"⚠️ torch inter-op threads already set to {torch.get_num_interop_threads()}")
+
+    @property
+    def torch_threads(self) -> int:
+        """Intra-op threads of each model thread: TORCH_THREADS, or an even share of the CPU budget."""
+        return self._torch_threads or max(1, self.cpu_budget // self.threads)
+
+    def _init_thread(self):
+        self._local.model_thread = True
+        torch.set_num_threads(self.torch_threads)
+        logging.info(f"🧵 Inference thread {threading.current_thread().name} started with {self.torch_threads} torch threads")
+
+    def run(self, model: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Call `fn` on a model thread and return its result; `model` labels the queue metrics."""
+        if getattr(self._local, "model_thread", False):
+            return fn(*args, **kwargs)
+
+        with self._lock:
+            self._queued += 1
+        # The copied context carries the request's Server-Timing stages over to the model thread
+        context = contextvars.copy_context()
+        future = self._pool.submit(context.run, self._call, model, time.perf_counter(), fn, args, kwargs)
+        return future.result()
+
+    def _call(self, model: str, submitted: float, fn: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        started = time.perf_counter()
+        INFERENCE_QUEUE_SECONDS.observe(started - submitted, model=model)
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            finished = time.perf_counter()
+            with self._lock:
+                self._running -= 1
+                stats = self._stats.setdefault(model, {"calls": 0, "queue_ms": 0.0, "busy_ms": 0.0})
+                stats["calls"] += 1
+                stats["queue_ms"] += (started - submitted) * 1000
+                stats["busy_ms"] += (finished - started) * 1000
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            models = {
+                model: {
+                    "calls": stats["calls"],
+                    "mean_queue_ms": round(stats["queue_ms"] / stats["calls"], 2),
+                    "mean_busy_ms": round(stats["busy_ms"] / stats["calls"], 2),
+                }
+                for model, stats in self._stats.items()
+            }
+            return {
+                "threads": self.threads,
+                "torch_threads": self.torch_threads,
+                "torch_interop_threads": torch.get_num_interop_threads(),
+                "cpu_budget": self.cpu_budget,
+                "queued": self._queued,
+                "running": self._running,
+                "models": models,
+            }
@@ -0,0 +1,168 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ml_model.optical_character_recognition import OpticalCharacterRecognition
+
+logging.basicConfig(format="%(asctime)s - %(levelname)s - %(name)s - %(message)s", level=logging.INFO)
+
+
+class MicroBatcher:
+    """Collects single items from many threads and runs them through `batch_fn` together.
+
+    A batch is flushed as soon as it holds `max_batch_size` items or the oldest item
+    has waited `max_wait_ms`. Each caller gets a `Future` resolved with its own output.
+    """
+
+    def __init__(self, name: str, batch_fn: Callable[[List[Any]], List[Any]], max_batch_size: int, max_wait_ms: float):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+
+        self._queue: "queue.Queue[Optional[Tuple[Any, Future]]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._items = 0
+        self._errors = 0
+
+        self._worker = threading.Thread(target=self._run, name=f"{name}-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, item: Any) -> Future:
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def submit_many(self, items: List[Any]) -> List[Future]:
+        return [self.submit(item) for item in items]
+
+    def shutdown(self):
+        self._queue.put(None)
+        self._worker.join()
+
+    def _collect(self) -> Optional[List[Tuple[Any, Future]]]:
+        first = self._queue.get()
+        if first is None:
+            return None
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                pending = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if pending is None:
+                # Flush what we have, then stop on the next loop
+                self._queue.put(None)
+                break
+            batch.append(pending)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+
+            batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            try:
+                outputs = self.batch_fn([item for item, _ in batch])
+                if len(outputs) != len(batch):
+                    # zip() would leave the callers past the shorter side waiting forever
+                    raise RuntimeError(f"{self.name} returned {len(outputs)} outputs for {len(batch)} items")
+            except Exception as e:
+                logging.error(f"❌ {self.name} batch of {len(batch)} failed: {str(e)}")
+                with self._lock:
+                    self._errors += 1
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            with self._lock:
+                self._batch_sizes[len(batch)] += 1
+                self._items += len(batch)
+            for (_, future), output in zip(batch, outputs):
+                future.set_result(output)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            batches = sum(self._batch_sizes.values())
+            return {
+                "queue_depth": self._queue.qsize(),
+                "batches": batches,
+                "items": self._items,
+                "errors": self._errors,
+                "mean_batch_size": round(self._items / batches, 2) if batches else 0.0,
+                "max_batch_size": max(self._batch_sizes, default=0),
+                "batch_size_histogram": {str(size): count for size, count in sorted(self._batch_sizes.items())},
+            }
+
+
+class InferenceScheduler:
+    """Cross-request micro-batching in front of `OpticalCharacterRecognition`.
+
+    Exposes the same `predict_yolo` / `predict_trocr_batch` / `read_pages` /
+    `inferencing[_batch]` calls, so a route can use either object. YOLO images and
+    TrOCR crops from concurrent requests are merged into shared batches, and each
+    model is driven by a single thread.
+    """
+
+    MAX_BATCH_SIZE = int(os.getenv("SCHEDULER_MAX_BATCH_SIZE") or 16)
+    MAX_WAIT_MS = float(os.getenv("SCHEDULER_MAX_WAIT_MS") or 10)
+
+    def __init__(self, ocr: OpticalCharacterRecognition, max_batch_size: Optional[int] = None, max_wait_ms: Optional[float] = None):
+        self.ocr = ocr
+        max_batch_size = max_batch_size or self.MAX_BATCH_SIZE
+        max_wait_ms = self.MAX_WAIT_MS if max_wait_ms is None else max_wait_ms
+
+        self.yolo_batcher = MicroBatcher("yolo", ocr.predict_yolo, max_batch_size, max_wait_ms)
+        # TrOCR items are (crop, class id) pairs so each crop keeps its generation profile
+        self.trocr_batcher = MicroBatcher(
+            "trocr",
+            lambda items: ocr.predict_trocr_batch([crop for crop, _ in items], class_ids=[class_id for _, class_id in items],
+                                                  max_batch_size=max_batch_size),
+            max_batch_size,
+            max_wait_ms,
+        )
+        logging.info(f"🧺 Inference scheduler started (max batch {max_batch_size}, max wait {max_wait_ms} ms)")
+
+    def predict_yolo(self, images: List[np.ndarray]) -> list:
+        return [future.result() for future in self.yolo_batcher.submit_many(images)]
+
+    def predict_trocr_batch(self, images: List[np.ndarray], class_ids: Optional[List[Optional[int]]] = None) -> List[str]:
+        class_ids = class_ids or [None] * len(images)
+        return [future.result() for future in self.trocr_batcher.submit_many(list(zip(images, class_ids)))]
+
+    def read_pages(self, images: List[np.ndarray], detections_list: list) -> List[dict]:
+        return self.ocr.read_pages(images, detections_list, recognize=self.predict_trocr_batch)
+
+    def inferencing(self, image: np.ndarray, detections) -> Tuple[str, List[str]]:
+        return self.ocr.inferencing(image, detections, recognize=self.predict_trocr_batch)
+
+    def inferencing_batch(self, images: List[np.ndarray], detections_list: list) -> List[Tuple[str, List[str]]]:
+        return self.ocr.inferencing_batch(images, detections_list, recognize=self.predict_trocr_batch)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "yolo": self.yolo_batcher.stats(),
+            "trocr": self.trocr_batcher.stats(),
+        }
+
+    def shutdown(self):
+        self.yolo_batcher.shutdown()
+        self.trocr_batcher.shutdown()
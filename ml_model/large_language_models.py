@@ -1,17 +1,30 @@
+import hashlib
 import os
-from functools import lru_cache
+import re
+import time
 from typing import Dict, Generator
 
 from dotenv import load_dotenv
 from langchain_core.prompts import ChatPromptTemplate
-from openai import OpenAI
 import logging
 
+from ml_model.cache import LRUCache, SingleFlight
+from ml_model.llm_client import PooledLLMClient
+from ml_model.metrics import observe_stage
+
 logging.basicConfig(format="%(asctime)s - %(levelname)s - %(name)s - %(message)s", level=logging.INFO)
 
 class Llama3_1_70B:
-    BASE_URL = "https://integrate.api.nvidia.com/v1"
+    BASE_URL = os.getenv("LLM_BASE_URL") or "https://integrate.api.nvidia.com/v1"
     MODEL = "meta/llama3-70b-instruct"
+    TEMPERATURE = 0.5
+    MAX_TOKENS = 1024
+    
+    # Bump whenever QUESTION_TEMPLATE or PROMPT_TEMPLATE changes so cached explanations are not reused
+    PROMPT_VERSION = "1"
+    CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES") or 1024)
+    CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB") or 32)
+    CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS") or 3600)
     
     QUESTION_TEMPLATE = """
     Tolong jelaskan resep medis ini:
@@ -40,10 +53,16 @@ class Llama3_1_70B:
         load_dotenv()
         self.client = self._create_client()
         self.chat_prompt_template = ChatPromptTemplate.from_template(self.PROMPT_TEMPLATE)
+        self.cache = LRUCache(
+            max_entries=self.CACHE_MAX_ENTRIES,
+            max_bytes=self.CACHE_MAX_MB * 1024 * 1024,
+            ttl=self.CACHE_TTL_SECONDS,
+            sizeof=lambda text: len(text.encode("utf-8")),
+        )
+        self.in_flight = SingleFlight()
 
-    @lru_cache(maxsize=1)
-    def _create_client(self) -> OpenAI:
-        return OpenAI(
+    def _create_client(self) -> PooledLLMClient:
+        return PooledLLMClient(
             base_url=self.BASE_URL,
             api_key=os.environ['NVIDIA_API_KEY']
         )
@@ -56,18 +75,76 @@ class Llama3_1_70B:
         return ''.join(completion)
 
     def _stream_completion(self, prompt: str) -> Generator[str, None, None]:
-        completion = self.client.chat.completions.create(
+        """Stream the completion, recording time to first token and total time of finished streams."""
+        started = time.perf_counter()
+        completion = self.client.stream_chat(
             model=self.MODEL,
             messages=[{"role": "user", "content": prompt}],
-            temperature=0.5,
-            max_tokens=1024,
-            stream=True
+            temperature=self.TEMPERATURE,
+            max_tokens=self.MAX_TOKENS,
         )
+        first_token = True
+        try:
+            for chunk in completion:
+                if first_token:
+                    observe_stage("llm_ttft", time.perf_counter() - started)
+                    first_token = False
+                yield chunk
+        finally:
+            completion.close()
+        observe_stage("llm_total", time.perf_counter() - started)
 
-        for chunk in completion:
-            if chunk.choices[0].delta.content is not None:
-                yield chunk.choices[0].delta.content
+    @staticmethod
+    def normalize_prescription_text(prescription_text: str) -> str:
+        """Collapse whitespace and blank lines so trivially different OCR outputs share a cache entry."""
+        lines = (re.sub(r"\s+", " ", line).strip() for line in prescription_text.splitlines())
+        return "\n".join(line for line in lines if line)
+
+    def cache_key(self, normalized_text: str) -> str:
+        fingerprint = f"{self.MODEL}|{self.TEMPERATURE}|{self.MAX_TOKENS}|{self.PROMPT_VERSION}|{normalized_text}"
+        return hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
 
     def analyze_prescription(self, prescription_text: str) -> str:
-        prompt = self.generate_prompt(prescription_text)
-        return self.get_response(prompt)
\ No newline at end of file
+        normalized_text = self.normalize_prescription_text(prescription_text)
+        key = self.cache_key(normalized_text)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            logging.info("♻️ Returning cached prescription explanation")
+            return cached
+
+        # Identical concurrent requests wait on the one upstream completion
+        return self.in_flight.do(key, lambda: self._explain(key, normalized_text))
+
+    def stream_prescription(self, prescription_text: str) -> Generator[str, None, None]:
+        """Yield the explanation as it is generated; cache it once the stream completes."""
+        normalized_text = self.normalize_prescription_text(prescription_text)
+        key = self.cache_key(normalized_text)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            logging.info("♻️ Streaming cached prescription explanation")
+            yield cached
+            return
+
+        chunks = []
+        completion = self._stream_completion(self.generate_prompt(normalized_text))
+        try:
+            for chunk in completion:
+                chunks.append(chunk)
+                yield chunk
+        finally:
+            completion.close()
+        self.cache.set(key, "".join(chunks))
+
+    def _explain(self, key: str, normalized_text: str) -> str:
+        prompt = self.generate_prompt(normalized_text)
+        response = self.get_response(prompt)
+        self.cache.set(key, response)
+        return response
+
+    def cache_stats(self) -> Dict:
+        return {**self.cache.stats(), **self.in_flight.stats()}
+
+    def client_stats(self) -> Dict:
+        return self.client.stats()
\ No newline at end of file
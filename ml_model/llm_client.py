@@ -0,0 +1,214 @@
+import logging
+import math
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Generator, Optional
+
+import httpx
+import openai
+from openai import DefaultHttpxClient, OpenAI
+
+from ml_model.errors import CircuitOpenError, UpstreamBusyError
+
+logging.basicConfig(format="%(asctime)s - %(levelname)s - %(name)s - %(message)s", level=logging.INFO)
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures and lets one probe through after `reset_timeout`."""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def cancel_probe(self):
+        """Give back a probe that ended without an outcome, so the next call can probe instead."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._probing:
+                    logging.warning(f"⚡ LLM circuit breaker opened after {self._failures} consecutive failures")
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+class PooledLLMClient:
+    """Synchronous OpenAI-compatible client shared by every request thread.
+
+    Bounds the HTTP connection pool and the number of concurrent upstream calls,
+    enforces a deadline per request, retries 429/5xx/connection errors with
+    jittered exponential backoff and stops calling upstream while the circuit
+    breaker is open.
+    """
+
+    MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS") or 20)
+    MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY") or 8)
+    TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS") or 60)
+    CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS") or 5)
+    MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES") or 3)
+    BACKOFF_BASE_SECONDS = 0.5
+    BACKOFF_MAX_SECONDS = 8.0
+    BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD") or 5)
+    BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS") or 30)
+
+    RETRYABLE_ERRORS = (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError)
+
+    def __init__(self, base_url: str, api_key: str):
+        self.http_client = DefaultHttpxClient(
+            limits=httpx.Limits(max_connections=self.MAX_CONNECTIONS, max_keepalive_connections=self.MAX_CONNECTIONS),
+        )
+        # Retries are done here, so the SDK's own retry loop is disabled
+        self.client = OpenAI(base_url=base_url, api_key=api_key, http_client=self.http_client, max_retries=0)
+        self.breaker = CircuitBreaker(self.BREAKER_FAILURE_THRESHOLD, self.BREAKER_RESET_SECONDS)
+
+        self._slots = threading.BoundedSemaphore(self.MAX_CONCURRENCY)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._counters = {"requests": 0, "retries": 0, "failures": 0, "rejected": 0}
+
+    def stream_chat(self, timeout: Optional[float] = None, **create_kwargs: Any) -> Generator[str, None, None]:
+        """Yield content deltas of a streamed chat completion within `timeout` seconds overall."""
+        deadline = time.monotonic() + (timeout or self.TIMEOUT_SECONDS)
+        self._count("requests")
+
+        # Fail fast while open, without queueing for a slot first
+        if self.breaker.state == "open":
+            self._count("rejected")
+            raise self._circuit_open_error()
+
+        # The slot comes first: a half-open breaker's single probe must not be spent waiting for one
+        slot_timeout = max(0.0, deadline - time.monotonic())
+        if not self._slots.acquire(timeout=slot_timeout):
+            self._count("rejected")
+            raise UpstreamBusyError("Timed out waiting for a free LLM upstream slot", retry_after=max(1, math.ceil(slot_timeout)))
+
+        if not self.breaker.allow():
+            self._slots.release()
+            self._count("rejected")
+            raise self._circuit_open_error()
+
+        self._track(+1)
+        try:
+            try:
+                completion = self._create_with_retries(deadline, create_kwargs)
+            except BaseException:
+                # Upstream errors already recorded their outcome; anything else must not keep the probe forever
+                self.breaker.cancel_probe()
+                raise
+            # The upstream answered; a cancelled stream after this point is not its fault
+            self.breaker.record_success()
+            try:
+                for chunk in completion:
+                    if time.monotonic() > deadline:
+                        raise TimeoutError("LLM request deadline exceeded while streaming")
+                    if chunk.choices and chunk.choices[0].delta.content is not None:
+                        yield chunk.choices[0].delta.content
+            except (openai.APIError, httpx.HTTPError, TimeoutError):
+                self._count("failures")
+                self.breaker.record_failure()
+                raise
+            finally:
+                completion.close()
+        finally:
+            self._track(-1)
+            self._slots.release()
+
+    def _circuit_open_error(self) -> CircuitOpenError:
+        return CircuitOpenError("LLM upstream is unavailable, circuit breaker is open",
+                                retry_after=max(1, math.ceil(self.BREAKER_RESET_SECONDS)))
+
+    def _create_with_retries(self, deadline: float, create_kwargs: Dict[str, Any]):
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._count("failures")
+                self.breaker.record_failure()
+                raise TimeoutError("LLM request deadline exceeded")
+            try:
+                return self.client.chat.completions.create(
+                    stream=True,
+                    timeout=httpx.Timeout(remaining, connect=min(remaining, self.CONNECT_TIMEOUT_SECONDS)),
+                    **create_kwargs,
+                )
+            except self.RETRYABLE_ERRORS as e:
+                delay = self._backoff(attempt, e)
+                if attempt >= self.MAX_RETRIES or time.monotonic() + delay >= deadline:
+                    self._count("failures")
+                    self.breaker.record_failure()
+                    raise
+                attempt += 1
+                self._count("retries")
+                logging.warning(f"🔁 LLM upstream error ({type(e).__name__}), retry {attempt}/{self.MAX_RETRIES} in {delay:.2f}s")
+                time.sleep(delay)
+            except openai.APIStatusError:
+                # A 4xx still proves the upstream is reachable
+                self.breaker.record_success()
+                raise
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """Full-jitter exponential backoff, never shorter than an upstream Retry-After."""
+        delay = random.uniform(0, min(self.BACKOFF_MAX_SECONDS, self.BACKOFF_BASE_SECONDS * 2 ** attempt))
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        return delay
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _track(self, delta: int):
+        with self._lock:
+            self._in_flight += delta
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._counters,
+                "in_flight": self._in_flight,
+                "max_concurrency": self.MAX_CONCURRENCY,
+                "circuit_breaker": self.breaker.state,
+            }
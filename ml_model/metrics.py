@@ -0,0 +1,154 @@
+import bisect
+import contextvars
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+COUNT_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128)
+
+# Stages timed on the current request's thread, for the Server-Timing header; None outside a request
+_request_stages: contextvars.ContextVar = contextvars.ContextVar("request_stages", default=None)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(labelnames, labelvalues)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus text format; `observe` is one bisect and a lock."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # Per label set: [count per bucket (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (bucket_counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), bucket_counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: list = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self._metrics for line in metric.render()) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram("trxnslate_stage_seconds", "Time spent per processing stage", ["stage"])
+BATCH_SIZE = registry.histogram("trxnslate_model_batch_size", "Inputs per model call", ["model"], COUNT_BUCKETS)
+BOXES_PER_IMAGE = registry.histogram("trxnslate_boxes_per_image", "YOLO boxes per image, before (detected) and after (kept) suppression", ["kind"], COUNT_BUCKETS)
+CROPS_PER_REQUEST = registry.histogram("trxnslate_crops_per_request", "Crops sent to TrOCR per request", [], COUNT_BUCKETS)
+CROP_CACHE_LOOKUPS = registry.counter("trxnslate_trocr_crop_cache_lookups_total", "TrOCR crop cache lookups by result (hit, miss, or repeat of a crop missed earlier in the same call)", ["result"])
+REQUESTS = registry.counter("trxnslate_http_requests_total", "HTTP requests by endpoint and status", ["endpoint", "status"])
+REQUEST_SECONDS = registry.histogram("trxnslate_http_request_seconds", "HTTP request handling time (until the response starts)", ["endpoint"])
+INFERENCE_QUEUE_SECONDS = registry.histogram("trxnslate_inference_queue_seconds", "Time model calls waited for an inference thread", ["model"])
+ADMISSION_WAIT_SECONDS = registry.histogram("trxnslate_admission_wait_seconds", "Time admitted requests waited for model capacity", ["pool"])
+ADMISSION_REJECTED = registry.counter("trxnslate_admission_rejected_total", "Requests shed by admission control", ["pool", "reason"])
+
+
+class timed:
+    """Context manager observing the block's duration under `stage`; `ms` holds it afterwards."""
+
+    __slots__ = ("stage", "started", "ms")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.ms = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self.started
+        self.ms = round(seconds * 1000, 1)
+        observe_stage(self.stage, seconds)
+        return False
+
+
+def observe_stage(stage: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    stages = _request_stages.get()
+    if stages is not None:
+        stages.append((stage, seconds))
+
+
+def start_request_stages() -> contextvars.Token:
+    return _request_stages.set([])
+
+
+def request_stages() -> List[Tuple[str, float]]:
+    return _request_stages.get() or []
+
+
+def end_request_stages(token: contextvars.Token):
+    _request_stages.reset(token)
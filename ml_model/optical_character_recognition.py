@@ -1,17 +1,27 @@
 import logging
 import os
 import base64
+import hashlib
+import json
+import threading
+import time
 import numpy as np
+from contextlib import nullcontext
 from functools import lru_cache
-from typing import List, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import cv2
 import torch
+import supervision as sv
 from ultralytics import YOLO
 from transformers import VisionEncoderDecoderModel, TrOCRProcessor
 from huggingface_hub.utils import RepositoryNotFoundError
 from huggingface_hub import model_info
 
+from ml_model.cache import LRUCache, NearDuplicateCache
+from ml_model.inference_executor import InferenceExecutor
+from ml_model.metrics import BATCH_SIZE, BOXES_PER_IMAGE, CROP_CACHE_LOOKUPS, CROPS_PER_REQUEST, STAGE_SECONDS, observe_stage, timed
+
 logging.basicConfig(format="%(asctime)s - %(levelname)s - %(name)s - %(message)s", level=logging.INFO)
 
 class OCRHelper:
@@ -42,67 +52,517 @@ class OCRHelper:
         return filtered_detections
 
     @staticmethod
-    def convert_image_to_base64(image: np.ndarray) -> str:
-        _, encoded_image = cv2.imencode(".jpg", image)
-        return base64.b64encode(encoded_image).decode("utf-8")
+    def iou_matrix(boxes: np.ndarray) -> np.ndarray:
+        """Pairwise IoU of `(N, 4)` xyxy boxes, computed with broadcasting."""
+        boxes = np.asarray(boxes).reshape(-1, 4)
+        x1 = np.maximum(boxes[:, None, 0], boxes[None, :, 0])
+        y1 = np.maximum(boxes[:, None, 1], boxes[None, :, 1])
+        x2 = np.minimum(boxes[:, None, 2], boxes[None, :, 2])
+        y2 = np.minimum(boxes[:, None, 3], boxes[None, :, 3])
+
+        intersection_area = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+        box_area = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        union_area = box_area[:, None] + box_area[None, :] - intersection_area
+
+        iou = np.zeros(intersection_area.shape, dtype=np.result_type(intersection_area, np.float32))
+        np.divide(intersection_area, union_area, out=iou, where=union_area > 0)
+        return iou
+
+    @staticmethod
+    def suppress_similar_boxes(boxes: np.ndarray, iou_threshold: float = 0.7) -> np.ndarray:
+        """Array-backed equivalent of `filter_similar_boxes`.
+
+        Returns the indices of the kept boxes, ordered by their top edge (y1).
+        """
+        boxes = np.asarray(boxes).reshape(-1, 4)
+        order = np.argsort(boxes[:, 1], kind="stable")
+        iou = OCRHelper.iou_matrix(boxes[order])
+
+        suppressed = np.zeros(len(order), dtype=bool)
+        keep = []
+        for i in range(len(order)):
+            if suppressed[i]:
+                continue
+            keep.append(i)
+            suppressed[i + 1:] |= iou[i, i + 1:] >= iou_threshold
+        return order[np.asarray(keep, dtype=np.intp)]
+
+    # Crops are compared at a fixed, text-line shaped size: small enough to absorb scan noise and JPEG artifacts
+    CROP_NORMALIZED_SIZE = (128, 32)
+
+    @staticmethod
+    def normalize_crop(image: np.ndarray, size: Tuple[int, int] = CROP_NORMALIZED_SIZE) -> np.ndarray:
+        """Grayscale copy of a crop resized to `size` (width, height)."""
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        return cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+
+    @staticmethod
+    def crop_digest(image: np.ndarray) -> str:
+        """Exact-match key of a crop: the hash of its normalized pixels."""
+        return hashlib.sha1(np.ascontiguousarray(OCRHelper.normalize_crop(image)).tobytes()).hexdigest()
+
+    @staticmethod
+    def perceptual_hash(image: np.ndarray) -> int:
+        """64-bit DCT hash of a crop; similar crops differ in few bits.
+
+        Text lines are wide, so the hash keeps the 4 lowest vertical by 16 lowest non-zero
+        horizontal frequencies and sets a bit per coefficient above their median.
+        """
+        normalized = OCRHelper.normalize_crop(image, (64, 16)).astype(np.float32)
+        low_frequencies = cv2.dct(normalized)[:4, 1:17].flatten()
+        bits = low_frequencies > np.median(low_frequencies)
+        return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+    @staticmethod
+    def aspect_bucket(image: np.ndarray) -> int:
+        """Width/height ratio in quarter steps on a log2 scale, so a stamp never matches a long line."""
+        height, width = image.shape[:2]
+        return int(round(np.log2(max(width, 1) / max(height, 1)) * 4))
+
+    IMAGE_ENCODINGS = {
+        "jpeg": (".jpg", cv2.IMWRITE_JPEG_QUALITY),
+        "webp": (".webp", cv2.IMWRITE_WEBP_QUALITY),
+    }
+
+    @staticmethod
+    def encode_image(image: np.ndarray, image_format: str = "jpeg", quality: Optional[int] = None) -> bytes:
+        """Encode to JPEG or WebP; `quality` (1-100) defaults to the encoder's own default."""
+        extension, quality_flag = OCRHelper.IMAGE_ENCODINGS[image_format]
+        params = [quality_flag, int(quality)] if quality is not None else []
+        ok, encoded_image = cv2.imencode(extension, image, params)
+        if not ok:
+            raise ValueError(f"Could not encode image as {image_format}")
+        return encoded_image.tobytes()
+
+    @staticmethod
+    def convert_image_to_base64(image: np.ndarray, image_format: str = "jpeg", quality: Optional[int] = None) -> str:
+        return base64.b64encode(OCRHelper.encode_image(image, image_format, quality)).decode("utf-8")
 
 class OpticalCharacterRecognition:
     LABEL_MAP = {0: "Prescriptio", 1: "Signatura"}
+    TROCR_BATCH_SIZE = int(os.getenv("TROCR_BATCH_SIZE") or 16)
+    YOLO_CONF = 0.25
+    YOLO_IOU = 0.45
+    BOX_FILTER_IOU = 0.7
+    # YOLO letterboxes to 640 px anyway, so detecting on a bounded copy keeps accuracy
+    DETECT_MAX_SIDE = int(os.getenv("DETECT_MAX_SIDE") or 1280)
+    # fp32: PyTorch eager; int8: dynamically quantized TrOCR Linear layers (CPU);
+    # bf16: bfloat16 autocast where the hardware supports it; onnx: ONNX Runtime for both models (CPU)
+    BACKENDS = ("fp32", "int8", "bf16", "onnx")
+    BACKEND = (os.getenv("OCR_BACKEND") or "fp32").lower()
+    ONNX_DIR = os.getenv("ONNX_MODEL_DIR") or "ml_model/onnx"
+    # `generate` settings per detected class: drug names (Prescriptio) are short, dosage
+    # lines (Signatura) longer. TROCR_GENERATION_PROFILES takes JSON overriding single
+    # fields, e.g. {"Signatura": {"num_beams": 3}}; "default" covers crops without a class.
+    GENERATION_PROFILES = {
+        "default": {"num_beams": 1, "max_new_tokens": 64},
+        "Prescriptio": {"num_beams": 1, "max_new_tokens": 32},
+        "Signatura": {"num_beams": 1, "max_new_tokens": 48},
+    }
+    GENERATION_FIELDS = ("num_beams", "max_new_tokens", "early_stopping", "length_penalty", "no_repeat_ngram_size")
+    # Recognized text per normalized crop: "exact" matches identical crops, "phash" also near
+    # duplicates within TROCR_CROP_CACHE_DISTANCE bits of a perceptual hash, "off" disables it
+    CROP_CACHE_MODES = ("off", "exact", "phash")
+    CROP_CACHE_MODE = (os.getenv("TROCR_CROP_CACHE") or "exact").lower()
+    CROP_CACHE_ENTRIES = int(os.getenv("TROCR_CROP_CACHE_ENTRIES") or 4096)
+    CROP_CACHE_DISTANCE = int(os.getenv("TROCR_CROP_CACHE_DISTANCE") or 4)
 
-    def __init__(self):
+    def __init__(self, backend: Optional[str] = None):
         self.cwd = os.getcwd()
         logging.info(f"📂 Current Working Directory: {self.cwd}")
         
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.backend = (backend or self.BACKEND).lower()
+        if self.backend not in self.BACKENDS:
+            raise ValueError(f"OCR_BACKEND must be one of {', '.join(self.BACKENDS)}")
+        
+        # Dynamic quantization and the ONNX Runtime CPU provider only run on CPU
+        use_cuda = torch.cuda.is_available() and self.backend in ("fp32", "bf16")
+        self.device = torch.device("cuda" if use_cuda else "cpu")
         logging.info(f"⚡ Acceleration Used: {self.device}")
         
+        if self.backend == "bf16" and not self.bf16_supported(self.device):
+            logging.warning("⚠️ bfloat16 is not supported on this hardware, falling back to fp32")
+            self.backend = "fp32"
+        logging.info(f"🧮 Inference backend: {self.backend}")
+        
+        self.generation_profiles = self.load_generation_profiles(os.getenv("TROCR_GENERATION_PROFILES"))
+        self._decode_lock = threading.Lock()
+        self._decode_stats: Dict[str, Dict[str, float]] = {}
+        self.crop_cache = self.create_crop_cache()
+        # Model threads that run every YOLO forward and TrOCR decode, see InferenceExecutor
+        self.executor = InferenceExecutor()
+        
         self.model_trocr = self.load_trocr_model()
         self.processor_trocr = TrOCRProcessor.from_pretrained("microsoft/trocr-large-handwritten")
         self.model_yolo = self.load_yolo_model()
+        self.model_version = self.describe_model_version()
 
     @lru_cache(maxsize=1)
     def load_trocr_model(self):
         model_source_path = "fathurfrs/trocr-large-handwritten-prescription"
         logging.info(f"📂 TrOCR model HuggingFace repository: {model_source_path}")
         try:
-            model_info(model_source_path)
-            return VisionEncoderDecoderModel.from_pretrained(model_source_path).to(self.device)
+            self.trocr_revision = model_info(model_source_path).sha
+            if self.backend == "onnx":
+                return self.load_trocr_onnx(model_source_path)
+            model = VisionEncoderDecoderModel.from_pretrained(model_source_path).to(self.device)
         except RepositoryNotFoundError:
             raise FileNotFoundError(f"❌ TrOCR model not found at https://huggingface.co/{model_source_path}")
+        
+        if self.backend == "int8":
+            # Weights of every encoder/decoder Linear become int8; activations are quantized on the fly
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            logging.info("🗜️ TrOCR Linear layers dynamically quantized to int8")
+        return model
+
+    def load_trocr_onnx(self, model_source_path: str):
+        """TrOCR on ONNX Runtime, exported once per model revision into ONNX_DIR."""
+        try:
+            from optimum.onnxruntime import ORTModelForVision2Seq
+        except ImportError:
+            raise ImportError("❌ OCR_BACKEND=onnx requires `pip install optimum[onnxruntime]`")
+        
+        export_dir = os.path.join(self.cwd, self.ONNX_DIR, f"trocr-{self.trocr_revision}")
+        if os.path.isdir(export_dir):
+            logging.info(f"📂 TrOCR ONNX export: {export_dir}")
+            return ORTModelForVision2Seq.from_pretrained(export_dir)
+        
+        logging.info(f"📦 Exporting TrOCR to ONNX into {export_dir}")
+        model = ORTModelForVision2Seq.from_pretrained(model_source_path, export=True)
+        model.save_pretrained(export_dir)
+        return model
 
     @lru_cache(maxsize=1)
     def load_yolo_model(self):
         absolute_path = os.path.join(self.cwd, "ml_model/yolov10/best.pt")
         logging.info(f"📂 YOLO model local path: {absolute_path}")
-        if os.path.exists(absolute_path):
-            return YOLO(absolute_path)
-        else:
+        if not os.path.exists(absolute_path):
             raise FileNotFoundError(f"❌ YOLO model not found at {absolute_path}")
+        if self.backend == "onnx":
+            return YOLO(self.export_yolo_onnx(absolute_path), task="detect")
+        return YOLO(absolute_path)
+
+    def export_yolo_onnx(self, weights_path: str) -> str:
+        """Path of the ONNX export of `weights_path`, exporting it when these weights have none yet."""
+        weights_stat = os.stat(weights_path)
+        onnx_path = os.path.join(self.cwd, self.ONNX_DIR, f"yolo-{weights_stat.st_size}-{weights_stat.st_mtime_ns}.onnx")
+        if not os.path.exists(onnx_path):
+            logging.info(f"📦 Exporting YOLO to ONNX into {onnx_path}")
+            # Dynamic axes so a whole micro-batch goes through one session run
+            exported_path = YOLO(weights_path).export(format="onnx", dynamic=True, imgsz=640)
+            os.makedirs(os.path.dirname(onnx_path), exist_ok=True)
+            os.replace(exported_path, onnx_path)
+        logging.info(f"📂 YOLO ONNX export: {onnx_path}")
+        return onnx_path
+
+    @classmethod
+    def load_generation_profiles(cls, overrides: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """GENERATION_PROFILES merged with the JSON `overrides`, as complete `generate` kwargs."""
+        profiles = {label: dict(profile) for label, profile in cls.GENERATION_PROFILES.items()}
+        for label, fields in (json.loads(overrides) if overrides else {}).items():
+            unknown = set(fields) - set(cls.GENERATION_FIELDS)
+            if unknown:
+                raise ValueError(f"Unknown TrOCR generation settings for {label}: {', '.join(sorted(unknown))}")
+            profiles.setdefault(label, dict(profiles["default"])).update(fields)
+
+        for profile in profiles.values():
+            # Stop a beam search once every beam is finished instead of running to max_new_tokens
+            profile.setdefault("early_stopping", profile["num_beams"] > 1)
+            # Reuse the decoder's past key/values so each step only attends for the new token
+            profile["use_cache"] = True
+        return profiles
+
+    @classmethod
+    def create_crop_cache(cls):
+        if cls.CROP_CACHE_MODE not in cls.CROP_CACHE_MODES:
+            raise ValueError(f"TROCR_CROP_CACHE must be one of {', '.join(cls.CROP_CACHE_MODES)}")
+        if cls.CROP_CACHE_MODE == "off":
+            return None
+        logging.info(f"🗂️ TrOCR crop cache: {cls.CROP_CACHE_MODE}, {cls.CROP_CACHE_ENTRIES} entries")
+        if cls.CROP_CACHE_MODE == "phash":
+            return NearDuplicateCache(max_entries=cls.CROP_CACHE_ENTRIES, max_distance=cls.CROP_CACHE_DISTANCE)
+        return LRUCache(max_entries=cls.CROP_CACHE_ENTRIES)
+
+    def crop_cache_key(self, image: np.ndarray, profile_name: str):
+        """Crop cache key; the profile is part of it since generation settings change the text."""
+        if self.CROP_CACHE_MODE == "phash":
+            group = int(hashlib.sha1(f"{profile_name}|{OCRHelper.aspect_bucket(image)}".encode("utf-8")).hexdigest()[:15], 16)
+            return group, OCRHelper.perceptual_hash(image)
+        return profile_name, OCRHelper.crop_digest(image)
+
+    def crop_cache_stats(self) -> Optional[Dict[str, Any]]:
+        if self.crop_cache is None:
+            return None
+        return {"mode": self.CROP_CACHE_MODE, **self.crop_cache.stats()}
+
+    @staticmethod
+    def bf16_supported(device: torch.device) -> bool:
+        if device.type == "cuda":
+            return torch.cuda.is_bf16_supported()
+        # CPU autocast runs anywhere, but is only faster than fp32 with native bf16 (AVX512-BF16 or AMX)
+        native_checks = ("_is_avx512_bf16_supported", "_is_amx_tile_supported")
+        return any(getattr(torch.cpu, name, lambda: False)() for name in native_checks)
+
+    def autocast(self):
+        """bfloat16 autocast for the bf16 backend, a no-op otherwise."""
+        if self.backend == "bf16":
+            return torch.autocast(device_type=self.device.type, dtype=torch.bfloat16)
+        return nullcontext()
+
+    def warm_up(self):
+        """Run both models once on a synthetic prescription so the first real request is not the slow one."""
+        started = time.perf_counter()
+        image = np.full((480, 640, 3), 255, dtype=np.uint8)
+        cv2.putText(image, "Amoxicillin 500 mg", (40, 160), cv2.FONT_HERSHEY_SIMPLEX, 1.4, (30, 30, 30), 3)
+        cv2.putText(image, "3 dd 1 tab", (40, 300), cv2.FONT_HERSHEY_SIMPLEX, 1.4, (30, 30, 30), 3)
+
+        self.predict_yolo([image])
+        self.predict_trocr_batch([image[110:190, 20:620]])
+        with self._decode_lock:
+            self._decode_stats.clear()
+        if self.crop_cache is not None:
+            self.crop_cache.clear()
+        logging.info(f"🔥 Models warmed up in {time.perf_counter() - started:.2f}s")
+
+    def describe_model_version(self) -> str:
+        """Identify the loaded weights and thresholds, for keys of cached OCR results."""
+        yolo_stat = os.stat(os.path.join(self.cwd, "ml_model/yolov10/best.pt"))
+        return f"trocr@{self.trocr_revision}|yolo@{yolo_stat.st_size}-{yolo_stat.st_mtime_ns}|conf={self.YOLO_CONF}|iou={self.YOLO_IOU}|filter={self.BOX_FILTER_IOU}|detect={self.DETECT_MAX_SIDE}|backend={self.backend}|gen={self.describe_generation_profiles()}"
+
+    def describe_generation_profiles(self) -> str:
+        encoded = json.dumps(self.generation_profiles, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()[:12]
+
+    def result_cache_key(self, image_bytes: bytes) -> str:
+        return hashlib.sha256(self.model_version.encode("utf-8") + b"\0" + image_bytes).hexdigest()
+
+    def prepare_detection_image(self, image: np.ndarray) -> Tuple[np.ndarray, Tuple[float, float]]:
+        """Downscale so the longest side fits DETECT_MAX_SIDE; returns the image and the (x, y) factors back to full size."""
+        height, width = image.shape[:2]
+        scale = self.DETECT_MAX_SIDE / max(height, width)
+        if scale >= 1:
+            return image, (1.0, 1.0)
+        resized_width, resized_height = max(1, round(width * scale)), max(1, round(height * scale))
+        resized = cv2.resize(image, (resized_width, resized_height), interpolation=cv2.INTER_AREA)
+        return resized, (width / resized_width, height / resized_height)
+
+    def predict_yolo(self, images: List[np.ndarray]) -> List[sv.Detections]:
+        """Run YOLO once over a list of BGR images and return one `Detections` per image.
+
+        Detection runs on bounded-size copies; boxes are mapped back to the full-resolution
+        coordinates so TrOCR still crops from the original image.
+        """
+        if not images:
+            return []
+        prepared = [self.prepare_detection_image(image) for image in images]
+        BATCH_SIZE.observe(len(images), model="yolo")
+        results = self.executor.run("yolo", self.run_yolo, [image for image, _ in prepared])
+
+        detections_list = []
+        for result, (_, (scale_x, scale_y)) in zip(results, prepared):
+            detections = sv.Detections.from_ultralytics(result)
+            BOXES_PER_IMAGE.observe(len(detections.xyxy), kind="detected")
+            if (scale_x, scale_y) != (1.0, 1.0):
+                detections.xyxy = detections.xyxy * np.array([scale_x, scale_y, scale_x, scale_y], dtype=detections.xyxy.dtype)
+            detections_list.append(detections)
+        return detections_list
+
+    def run_yolo(self, images: List[np.ndarray]) -> list:
+        """One YOLO forward; runs on an inference thread, since autocast is per thread."""
+        with timed("yolo_inference"), self.autocast():
+            return self.model_yolo(source=images, conf=self.YOLO_CONF, iou=self.YOLO_IOU, agnostic_nms=True)
 
     @torch.no_grad()
-    def predict_trocr(self, image: np.ndarray) -> str:
-        pixel_values = self.processor_trocr(image, return_tensors="pt").pixel_values.to(self.device)
-        generated_ids = self.model_trocr.generate(pixel_values)
-        return self.processor_trocr.batch_decode(generated_ids, skip_special_tokens=True)[0].replace(".jpg", "")
-    
-    def inferencing(self, image: np.ndarray, detections) -> Tuple[str, List[str]]:
-        detection_data = list(zip(detections.xyxy, detections.confidence, detections.class_id))
-        sorted_detections = sorted(detection_data, key=lambda x: x[0][1])
-        filtered_detections = OCRHelper.filter_similar_boxes(sorted_detections)
-
-        prescription_text = []
-        for box, confidence, class_id in filtered_detections:
-            x1, y1, x2, y2 = map(int, box)
-            
-            crop_img = image[y1:y2, x1:x2]
-            gen = self.predict_trocr(crop_img)
-            prescription_text.append(gen)
-            
+    def predict_trocr(self, image: np.ndarray, class_id: Optional[int] = None) -> str:
+        return self.predict_trocr_batch([image], class_ids=[class_id])[0]
+
+    def profile_name(self, class_id: Optional[int]) -> str:
+        label = self.LABEL_MAP.get(class_id, "default")
+        return label if label in self.generation_profiles else "default"
+
+    def predict_trocr_batch(self, images: List[np.ndarray], class_ids: Optional[List[Optional[int]]] = None,
+                            max_batch_size: Optional[int] = None) -> List[str]:
+        """Recognize many crops, keeping the input order.
+
+        Crops found in the crop cache are not decoded again, and crops sharing a cache key
+        within the call are decoded once.
+        """
+        class_ids = class_ids or [None] * len(images)
+        profile_names = [self.profile_name(class_id) for class_id in class_ids]
+        if self.crop_cache is None:
+            return self.executor.run("trocr", self.decode_crops, images, profile_names, max_batch_size)
+
+        keys = [self.crop_cache_key(image, profile_name) for image, profile_name in zip(images, profile_names)]
+        texts = [self.crop_cache.get(key) for key in keys]
+        # Cache key -> indices of the crops still to decode
+        missing: Dict[Any, List[int]] = {}
+        for index, (key, text) in enumerate(zip(keys, texts)):
+            if text is None:
+                missing.setdefault(key, []).append(index)
+        hits = sum(text is not None for text in texts)
+        CROP_CACHE_LOOKUPS.inc(hits, result="hit")
+        CROP_CACHE_LOOKUPS.inc(len(missing), result="miss")
+        # Not in the cache either, but decoded once together with an earlier crop of this call
+        CROP_CACHE_LOOKUPS.inc(len(images) - hits - len(missing), result="repeat")
+        if not missing:
+            return texts
+
+        first_indices = [indices[0] for indices in missing.values()]
+        decoded = self.executor.run("trocr", self.decode_crops, [images[i] for i in first_indices],
+                                    [profile_names[i] for i in first_indices], max_batch_size)
+        for (key, indices), text in zip(missing.items(), decoded):
+            self.crop_cache.set(key, text)
+            for index in indices:
+                texts[index] = text
+        return texts
+
+    @torch.no_grad()
+    def decode_crops(self, images: List[np.ndarray], profile_names: List[str], max_batch_size: Optional[int] = None) -> List[str]:
+        """Run TrOCR on crops, keeping the input order.
+
+        Crops are grouped by generation profile (see GENERATION_PROFILES) and each group
+        runs one `generate` call per chunk of `max_batch_size`.
+        """
+        max_batch_size = max_batch_size or self.TROCR_BATCH_SIZE
+
+        groups: Dict[str, List[int]] = {}
+        for index, profile_name in enumerate(profile_names):
+            groups.setdefault(profile_name, []).append(index)
+
+        texts: List[Optional[str]] = [None] * len(images)
+        for profile_name, indices in groups.items():
+            profile = self.generation_profiles[profile_name]
+            for start in range(0, len(indices), max_batch_size):
+                chunk = indices[start:start + max_batch_size]
+                # The processor resizes every crop to the encoder input size, so the chunk stacks into one tensor
+                pixel_values = self.processor_trocr(images=[images[i] for i in chunk], return_tensors="pt").pixel_values.to(self.device)
+                BATCH_SIZE.observe(len(chunk), model="trocr")
+                started = time.perf_counter()
+                with self.autocast():
+                    generated_ids = self.model_trocr.generate(pixel_values, **profile)
+                seconds = time.perf_counter() - started
+                observe_stage("trocr_generate", seconds)
+                STAGE_SECONDS.observe(seconds / len(chunk), stage="trocr_per_crop")
+                self.record_decode(profile_name, profile, generated_ids, seconds)
+
+                decoded = self.processor_trocr.batch_decode(generated_ids, skip_special_tokens=True)
+                for index, text in zip(chunk, decoded):
+                    texts[index] = text.replace(".jpg", "")
+        return texts
+
+    def record_decode(self, profile_name: str, profile: Dict[str, Any], generated_ids, seconds: float):
+        """Count decoder steps of one `generate` call.
+
+        Every chunk runs `sequence length - 1` decoder steps (the first token is the decoder
+        start token), however short its individual crops are; tokens per crop count what
+        each crop actually produced, and crops that hit `max_new_tokens` are counted as capped.
+        """
+        steps = generated_ids.shape[1] - 1
+        tokens = (generated_ids[:, 1:] != self.processor_trocr.tokenizer.pad_token_id).sum(dim=1).tolist()
+        with self._decode_lock:
+            stats = self._decode_stats.setdefault(profile_name, {
+                "crops": 0, "chunks": 0, "decoder_steps": 0, "tokens": 0, "max_tokens": 0, "capped": 0, "decode_ms": 0.0,
+            })
+            stats["crops"] += len(tokens)
+            stats["chunks"] += 1
+            stats["decoder_steps"] += steps
+            stats["tokens"] += sum(tokens)
+            stats["max_tokens"] = max(stats["max_tokens"], *tokens)
+            stats["capped"] += sum(count >= profile["max_new_tokens"] for count in tokens)
+            stats["decode_ms"] += seconds * 1000
+        logging.debug(f"🔡 TrOCR {profile_name}: {len(tokens)} crops, {steps} decoder steps, tokens per crop {tokens}")
+
+    def decode_stats(self) -> Dict[str, Any]:
+        """Decoder steps and tokens per generation profile since startup, for tuning the profiles."""
+        with self._decode_lock:
+            report = {}
+            for profile_name, stats in self._decode_stats.items():
+                report[profile_name] = {
+                    **{key: round(value, 1) if isinstance(value, float) else value for key, value in stats.items()},
+                    "mean_tokens_per_crop": round(stats["tokens"] / stats["crops"], 2),
+                    "mean_steps_per_chunk": round(stats["decoder_steps"] / stats["chunks"], 2),
+                    "ms_per_step": round(stats["decode_ms"] / stats["decoder_steps"], 2) if stats["decoder_steps"] else None,
+                    "profile": dict(self.generation_profiles[profile_name]),
+                }
+            return report
+
+    def filter_detections(self, detections) -> np.ndarray:
+        """Indices of the detections left after suppression, in reading (y1) order."""
+        with timed("box_filter"):
+            keep = OCRHelper.suppress_similar_boxes(detections.xyxy, self.BOX_FILTER_IOU)
+        BOXES_PER_IMAGE.observe(len(keep), kind="kept")
+        return keep
+
+    def draw_detections(self, image: np.ndarray, boxes: List[Tuple[int, int, int, int]], confidences, class_ids):
+        for (x1, y1, x2, y2), confidence, class_id in zip(boxes, confidences, class_ids):
             color = (0, 255, 0) if class_id == 0 else (255, 0, 0)
             cv2.rectangle(image, (x1, y1), (x2, y2), color, 2)
             label = f"Class {self.LABEL_MAP[class_id]}: {confidence:.2f}"
             cv2.putText(image, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
-        
-        image_draw_bbox = OCRHelper.convert_image_to_base64(image)
-        
-        return image_draw_bbox, prescription_text
\ No newline at end of file
+
+    def read_pages(self, images: List[np.ndarray], detections_list: list, recognize: Optional[Callable[[List[np.ndarray], List[int]], List[str]]] = None) -> List[dict]:
+        """Filter the detections of every page and recognize all their crops in one call.
+
+        Returns one dict per page with the kept `boxes` (full-resolution xyxy), `confidences`,
+        `class_ids` and the recognized `texts`, all in reading order.
+        """
+        recognize = recognize or self.predict_trocr_batch
+
+        pages = []
+        crops = []
+        for image, detections in zip(images, detections_list):
+            keep = self.filter_detections(detections)
+            boxes = [tuple(map(int, box)) for box in detections.xyxy[keep]]
+            pages.append({
+                "boxes": boxes,
+                "confidences": [float(confidence) for confidence in detections.confidence[keep]],
+                "class_ids": [int(class_id) for class_id in detections.class_id[keep]],
+            })
+            crops.extend(image[y1:y2, x1:x2] for x1, y1, x2, y2 in boxes)
+
+        CROPS_PER_REQUEST.observe(len(crops))
+        texts = recognize(crops, [class_id for page in pages for class_id in page["class_ids"]])
+
+        offset = 0
+        for page in pages:
+            page["texts"] = texts[offset:offset + len(page["boxes"])]
+            offset += len(page["boxes"])
+        return pages
+
+    def describe_page(self, page: dict) -> List[dict]:
+        """JSON-ready detections of a `read_pages` page."""
+        return [
+            {"box": list(box), "label": self.LABEL_MAP.get(class_id, str(class_id)), "confidence": round(confidence, 4), "text": text}
+            for box, confidence, class_id, text in zip(page["boxes"], page["confidences"], page["class_ids"], page["texts"])
+        ]
+
+    def render_page(self, image: np.ndarray, page: dict, image_format: str = "jpeg", quality: Optional[int] = None,
+                    max_side: Optional[int] = None) -> bytes:
+        """Encoded copy of `image` with the page's boxes drawn, shrunk first when `max_side` is given.
+
+        Drawing happens after the resize so labels stay legible on thumbnails.
+        """
+        scale = 1.0
+        if max_side is not None:
+            scale = min(1.0, max_side / max(image.shape[:2]))
+        if scale < 1:
+            canvas = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            boxes = [tuple(int(round(v * scale)) for v in box) for box in page["boxes"]]
+        else:
+            canvas = image.copy()
+            boxes = page["boxes"]
+
+        with timed("render"):
+            self.draw_detections(canvas, boxes, page["confidences"], page["class_ids"])
+            return OCRHelper.encode_image(canvas, image_format, quality)
+
+    def inferencing(self, image: np.ndarray, detections, recognize: Optional[Callable[[List[np.ndarray], List[int]], List[str]]] = None) -> Tuple[str, List[str]]:
+        return self.inferencing_batch([image], [detections], recognize=recognize)[0]
+
+    def inferencing_batch(self, images: List[np.ndarray], detections_list: list, recognize: Optional[Callable[[List[np.ndarray], List[int]], List[str]]] = None) -> List[Tuple[str, List[str]]]:
+        """`inferencing` over several pages, recognizing the crops of every page in one call."""
+        pages = self.read_pages(images, detections_list, recognize=recognize)
+        return [
+            (base64.b64encode(self.render_page(image, page)).decode("utf-8"), page["texts"])
+            for image, page in zip(images, pages)
+        ]